@@ -1,9 +1,14 @@
 import streamlit as st
 from PIL import Image
 
+from utils.warmup import start_warmup, status_text
+
 st.set_page_config(
     page_title='Home')
 
+# Aquece os caches em segundo plano assim que o servidor recebe o primeiro acesso
+warmup = start_warmup()
+
 #image_path = r'D:\Downloads\Downloads\CURSO\7 Python\Arquivo\\'
 Image = Image.open('curry_companyPNG.png')
 st.sidebar.image(Image, width=120)
@@ -13,6 +18,11 @@ st.sidebar.markdown( '# Cury Company')
 st.sidebar.markdown( '## Fastest Delivery in Town')
 st.sidebar.markdown( """---""")
 
+st.sidebar.caption(status_text(warmup))
+if warmup['timings']:
+    with st.sidebar.expander('Tempo por etapa'):
+        st.dataframe({'etapa': list(warmup['timings']), 'segundos': [round(t, 3) for t in warmup['timings'].values()]})
+
 st.write('# Curry Company Growth Dashboard')
 import streamlit as st
 
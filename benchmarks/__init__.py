@@ -0,0 +1 @@
+"""Benchmarks das rotinas de dados do dashboard (executar a partir da raiz do projeto)."""
@@ -0,0 +1,90 @@
+"""
+Compara o cálculo de distância linha a linha (`df.apply` + `haversine`) com a
+versão vetorizada de `utils.geo`.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_distance
+    python -m benchmarks.bench_distance --sizes 50000 1000000 --max-apply-rows 200000
+
+Para tamanhos acima de --max-apply-rows o tempo do `apply` é estimado por
+extrapolação linear de uma amostra, já que ele cresce linearmente com o
+número de linhas e levaria vários minutos em 10M de linhas.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from haversine import haversine
+
+from utils.geo import delivery_distance
+
+
+def synthetic_coords(n, seed=0):
+    # Coordenadas na mesma faixa do dataset (Índia)
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(10, 30, n)
+    lon = rng.uniform(70, 88, n)
+    return pd.DataFrame({
+        'Restaurant_latitude': lat,
+        'Restaurant_longitude': lon,
+        'Delivery_location_latitude': lat + rng.uniform(0.01, 0.1, n),
+        'Delivery_location_longitude': lon + rng.uniform(0.01, 0.1, n),
+    })
+
+
+def apply_distance(df1):
+    return df1.apply(
+        lambda linha: haversine(
+            (linha['Restaurant_latitude'], linha['Restaurant_longitude']),
+            (linha['Delivery_location_latitude'], linha['Delivery_location_longitude'])
+        ),
+        axis=1
+    )
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run(sizes, max_apply_rows):
+    rows = []
+    for n in sizes:
+        df1 = synthetic_coords(n)
+
+        sample = df1.iloc[:min(n, max_apply_rows)]
+        t_apply, ref = timed(apply_distance, sample)
+        estimated = len(sample) < n
+        t_apply *= n / len(sample)
+
+        t_vec64, d64 = timed(delivery_distance, df1)
+        t_vec32, d32 = timed(delivery_distance, df1, dtype=np.float32)
+
+        err64 = np.max(np.abs(d64[:len(sample)] - ref.to_numpy()))
+        err32 = np.max(np.abs(d32[:len(sample)] - ref.to_numpy()))
+        rows.append({
+            'rows': n,
+            'apply_s': round(t_apply, 3),
+            'apply_estimado': estimated,
+            'vetorizado_f64_s': round(t_vec64, 4),
+            'vetorizado_f32_s': round(t_vec32, 4),
+            'speedup_f64': round(t_apply / t_vec64, 1),
+            'erro_max_f64_km': float(err64),
+            'erro_max_f32_km': float(err32),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50_000, 1_000_000, 10_000_000])
+    parser.add_argument('--max-apply-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(run(args.sizes, args.max_apply_rows).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Mede o custo das funções de dados das páginas e do "rerun" completo de cada
+página (filtros do sidebar + todas as métricas de `utils.metrics`) em vários
+tamanhos de base, sem precisar subir o servidor do Streamlit.
+
+Para cada tamanho são gerados pedidos sintéticos com o esquema do
+`train.csv` (benchmarks/synthetic.py). Cada caso é medido `--repeat` vezes
+(o melhor tempo é reportado) e uma vez com tracemalloc para o pico de
+memória.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_pages
+    python -m benchmarks.bench_pages --sizes 45000 1000000 10000000 --json bench.json
+
+O JSON gerado pode ser comparado entre versões para detectar regressões
+na latência das interações.
+"""
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_orders
+from utils import metrics
+from utils.activity import build_activity
+from utils.cleaning import clean_code, clean_parallel
+from utils.couriers import build_profiles, courier_table, page_profiles, search_profiles
+from utils.filters import FilterIndex
+from utils.histogram import build_histograms
+from utils.rollup import build_rollup, filter_rollup
+from utils.warmup import DATA_LIMITE_PADRAO, TRANSITO_PADRAO
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def measure(fn, repeat):
+    """Melhor tempo (s) em `repeat` execuções e pico de memória (MB) em uma execução."""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def page_cases(df1, cube, filtros, activity, perfis, hist):
+    """Casos medidos: {(página, nome): função sem argumentos}."""
+    cidades = filtros.values('City')
+
+    def filtrar():
+        return (
+            filtros.select(DATA_LIMITE_PADRAO, City=cidades, Road_traffic_density=TRANSITO_PADRAO),
+            filter_rollup(cube, DATA_LIMITE_PADRAO, cidades, TRANSITO_PADRAO),
+        )
+
+    return {
+        ('dados', 'filtros_sidebar'): filtrar,
+        ('empresa', 'order_by_week'): lambda: metrics.order_by_week(activity),
+        ('empresa', 'rolling_orders'): lambda: metrics.rolling_orders(activity),
+        ('empresa', 'city_traffic_centers'): lambda: metrics.city_traffic_centers(df1),
+        ('empresa', 'rerun'): lambda: metrics.compute_company(*filtrar()),
+        ('entregadores', 'top_delivery'): lambda: metrics.top_delivery(df1),
+        ('entregadores', 'rerun'): lambda: metrics.compute_courier(*filtrar()),
+        ('entregadores', 'perfis_busca'): lambda: page_profiles(perfis, search_profiles(perfis, 'DEL01')),
+        ('restaurante', 'time_by_city'): lambda: metrics.time_by(cube, ['City']),
+        ('restaurante', 'festival_time_stats'): lambda: metrics.festival_time_stats(cube),
+        ('restaurante', 'time_percentiles'): lambda: metrics.time_percentiles(filter_rollup(hist, DATA_LIMITE_PADRAO, cidades, TRANSITO_PADRAO), ['City']),
+        ('restaurante', 'distinct_counts'): lambda: metrics.distinct_counts(activity.filter(DATA_LIMITE_PADRAO, cidades, TRANSITO_PADRAO)),
+        ('restaurante', 'rerun'): lambda: metrics.compute_restaurant(*filtrar(), activity.filter(DATA_LIMITE_PADRAO, cidades, TRANSITO_PADRAO)),
+    }
+
+
+def run(sizes, repeat):
+    results = []
+    for n in sizes:
+        raw = synthetic_orders(n)
+
+        def record(page, case, fn):
+            seconds, peak = measure(fn, repeat)
+            results.append({'rows': n, 'page': page, 'case': case, 'seconds': seconds, 'peak_mb': peak})
+            print(f'{n:>10} {page:<13} {case:<25} {seconds:9.4f}s {peak:9.1f}MB', flush=True)
+
+        # Carga: limpeza e estruturas pré-calculadas
+        record('dados', 'clean_code', lambda: clean_code(raw.copy()))
+        # Um processo por CPU; com 1 CPU ou poucas linhas equivale a clean_code
+        record('dados', 'clean_parallel', lambda: clean_parallel(raw.copy()))
+        df1 = clean_code(raw)
+        del raw
+        record('dados', 'build_rollup', lambda: build_rollup(df1))
+        record('dados', 'filter_index', lambda: FilterIndex(df1))
+        record('dados', 'activity_store', lambda: build_activity(df1))
+        record('dados', 'courier_profiles', lambda: courier_table(build_profiles(df1)))
+        record('dados', 'histograms', lambda: build_histograms(df1))
+        cube = build_rollup(df1)
+        filtros = FilterIndex(df1)
+        activity = build_activity(df1)
+        perfis = courier_table(build_profiles(df1))
+        hist = build_histograms(df1)
+
+        for (page, case), fn in page_cases(df1, cube, filtros, activity, perfis, hist).items():
+            record(page, case, fn)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[45_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='arquivo onde gravar o relatório em JSON')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+
+    table = pd.DataFrame(results).pivot_table(index=['page', 'case'], columns='rows', values='seconds', sort=False)
+    print()
+    print(table.round(4).to_string())
+
+    if args.json:
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'results': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
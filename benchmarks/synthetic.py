@@ -0,0 +1,109 @@
+"""
+Gera pedidos sintéticos com o mesmo esquema e os mesmos "vícios" de
+`dataset/train.csv` (espaços sobrando, 'NaN ' como ausente, '(min) 24' no
+tempo de entrega, 'conditions Sunny' no clima etc.), para medir as rotinas
+de dados em tamanhos maiores que o dataset real.
+"""
+import numpy as np
+import pandas as pd
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+CITIES = ['Urban ', 'Metropolitian ', 'Semi-Urban ']
+TRAFFIC = ['Low ', 'Medium ', 'High ', 'Jam ']
+WEATHER = ['Sunny', 'Stormy', 'Cloudy', 'Fog', 'Windy', 'Sandstorms']
+ORDER_TYPES = ['Snack ', 'Meal ', 'Drinks ', 'Buffet ']
+VEHICLES = ['motorcycle ', 'scooter ', 'electric_scooter ']
+
+# Proporções aproximadas do dataset real
+ORDERS_PER_COURIER = 35
+RESTAURANT_ORDERS = 50
+POINT_ORDERS = 5
+MISSING_RATE = 0.03
+FESTIVAL_RATE = 0.02
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def _pick(rng, pool, n, missing=0.0):
+    # Escolhe valores de um "pool" de textos, com uma fração de 'NaN '
+    values = np.asarray(list(pool) + ['NaN '], dtype=object)
+    idx = rng.integers(0, len(values) - 1, n)
+    if missing:
+        idx[rng.random(n) < missing] = len(values) - 1
+    return values[idx]
+
+
+def synthetic_orders(n, seed=0):
+    """
+    Retorna um DataFrame de `n` pedidos como lido por `pd.read_csv(..., dtype=str)`
+    do `train.csv` (todas as colunas texto).
+    """
+    rng = np.random.default_rng(seed)
+
+    n_couriers = max(n // ORDERS_PER_COURIER, 10)
+    couriers = [f'CITY{i % 997:03d}RES{i // 997:04d}DEL0{i % 3 + 1} ' for i in range(n_couriers)]
+
+    # Coordenadas vêm de "pools" de restaurantes e locais de entrega, para
+    # que a conversão para texto não domine o tempo de geração
+    restaurants = max(n // RESTAURANT_ORDERS, 10)
+    rest_lat = rng.uniform(10, 30, restaurants)
+    rest_lon = rng.uniform(70, 88, restaurants)
+    # Dados reais têm ~1% de coordenadas zeradas ou com sinal trocado
+    bad = rng.random(restaurants)
+    rest_lat_text = np.where(bad < 0.005, 0.0, np.where(bad < 0.01, -rest_lat, rest_lat)).astype(str).astype(object)
+    rest_lon_text = np.where(bad < 0.005, 0.0, rest_lon).astype(str).astype(object)
+
+    points = max(n // POINT_ORDERS, 10)
+    point_rest = rng.integers(0, restaurants, points)
+    point_lat = (rest_lat[point_rest] + rng.uniform(0.01, 0.1, points)).astype(str).astype(object)
+    point_lon = (rest_lon[point_rest] + rng.uniform(0.01, 0.1, points)).astype(str).astype(object)
+    point_idx = rng.integers(0, points, n)
+    rest_idx = point_rest[point_idx]
+
+    dates = pd.date_range('2022-02-11', '2022-04-06').strftime('%d-%m-%Y')
+    minutes = [f'{m // 60:02d}:{m % 60:02d}:00' for m in range(24 * 60)]
+    order_min = rng.integers(8 * 60, 24 * 60, n)
+    picked_min = (order_min + rng.choice([5, 10, 15], n)) % (24 * 60)
+    minutes = np.asarray(minutes, dtype=object)
+
+    order_time = minutes[order_min]
+    order_time[rng.random(n) < MISSING_RATE] = 'NaN '
+
+    festival = np.where(rng.random(n) < FESTIVAL_RATE, 'Yes ', 'No ').astype(object)
+    festival[rng.random(n) < 0.005] = 'NaN '
+
+    weather = np.asarray([f'conditions {w}' for w in WEATHER], dtype=object)[rng.integers(0, len(WEATHER), n)]
+    weather[rng.random(n) < 0.015] = 'conditions NaN'
+
+    ages = [str(a) for a in range(18, 40)]
+    ratings = [f'{r / 10:.1f}' for r in range(25, 51)]
+    time_taken = np.asarray([f'(min) {t}' for t in range(10, 55)], dtype=object)
+
+    return pd.DataFrame({
+        'ID': pd.Series(np.arange(n)).astype(str).radd('0x').add(' ').to_numpy(dtype=object),
+        'Delivery_person_ID': np.asarray(couriers, dtype=object)[rng.integers(0, n_couriers, n)],
+        'Delivery_person_Age': _pick(rng, ages, n, MISSING_RATE),
+        'Delivery_person_Ratings': _pick(rng, ratings, n, MISSING_RATE),
+        'Restaurant_latitude': rest_lat_text[rest_idx],
+        'Restaurant_longitude': rest_lon_text[rest_idx],
+        'Delivery_location_latitude': point_lat[point_idx],
+        'Delivery_location_longitude': point_lon[point_idx],
+        'Order_Date': np.asarray(dates, dtype=object)[rng.integers(0, len(dates), n)],
+        'Time_Orderd': order_time,
+        'Time_Order_picked': minutes[picked_min],
+        'Weatherconditions': weather,
+        'Road_traffic_density': _pick(rng, TRAFFIC, n, MISSING_RATE),
+        'Vehicle_condition': rng.integers(0, 4, n).astype(str),
+        'Type_of_order': _pick(rng, ORDER_TYPES, n),
+        'Type_of_vehicle': _pick(rng, VEHICLES, n),
+        'multiple_deliveries': _pick(rng, ['0', '1', '2', '3'], n, MISSING_RATE),
+        'Festival': festival,
+        'City': _pick(rng, CITIES, n, MISSING_RATE),
+        'Time_taken(min)': time_taken[rng.integers(0, len(time_taken), n)],
+    })
+
+
+def write_csv(path, n, seed=0):
+    """Grava `n` pedidos sintéticos em `path` no formato do train.csv."""
+    synthetic_orders(n, seed).to_csv(path, index=False)
@@ -1,93 +1,19 @@
-import plotly.express as px
 import pandas as pd
-from haversine import haversine
-import io
-import numpy as np
-import folium
 import streamlit as st
 from datetime import datetime
 from PIL import Image
-from streamlit_folium import folium_static
 
-st.set_page_config( page_title="Visão Entregadores", layout="wide")
+from utils.metrics import TOP_K, TRAFFIC_OPTIONS, available_cities, courier_metrics, courier_profiles, make_filters
+from utils.profiling import finish_run, start_run, timer, to_jsonl
+from utils.warmup import DATA_LIMITE_PADRAO, TRANSITO_PADRAO, start_warmup, status_text
 
-#----------------FUNÇÕES--------------
-#-------------------------------------
-def clean_code(df1):
-    # Esta função é usada para limpar o dataframe.
-
-    # Tratar idade do entregador
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(str).str.strip()
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].replace(['NaN', '', 'NaN '], np.nan)
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(float).astype('Int64')
-
-    # Transformar data em datetime
-    df1['Order_Date'] = pd.to_datetime(df1["Order_Date"], format='%d-%m-%Y')
-
-    # Criar week_of_year
-    df1 = df1.dropna(subset=['Order_Date']).copy()
-    df1['week_of_year'] = df1['Order_Date'].dt.isocalendar().week.astype(int)
-
-    # Transformar rating em numérico
-    df1['Delivery_person_Ratings'] = pd.to_numeric(df1['Delivery_person_Ratings'], errors='coerce')
-
-    # Limpar City
-    df1['City'] = (
-        df1['City']
-        .astype('string')
-        .str.strip()
-        .replace({'NaN': np.nan, 'nan': np.nan, 'NULL': np.nan, 'null': np.nan, '': np.nan})
-    )
-
-    # Limpar Festival
-    df1['Festival'] = (
-        df1['Festival']
-        .astype('string')
-        .str.strip()
-        .str.capitalize()
-        .replace({'Nan': np.nan, '': np.nan})
-    )
-
-    # Limpar Weatherconditions -> criar Weather_clean
-    s = df1['Weatherconditions'].astype('string').str.strip()
-    s = s.replace(['conditions NaN', 'NaN', 'nan', 'None', 'none', ''], pd.NA)
-    s = s.str.replace(r'^conditions\s+', '', regex=True)
-    df1['Weather_clean'] = s
-
-    # Garantir que 'Time_taken(min)' seja numérico
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype(str).str.extract('(\d+)')
-    df1['Time_taken(min)'] = pd.to_numeric(df1['Time_taken(min)'], errors='coerce')
-
-    return df1
-
-
-def top_delivery(df1, top_asc):
-    df2 = (
-        df1.loc[:, ['Delivery_person_ID', 'City', 'Time_taken(min)']]
-           .groupby(['City', 'Delivery_person_ID'])
-           .mean()
-           .sort_values(['City', 'Time_taken(min)'], ascending = top_asc)
-           .reset_index()
-    )
-
-    df_aux01 = df2.loc[df2['City'] == 'Metropolitan', :].head(10)
-    df_aux02 = df2.loc[df2['City'] == 'Urban', :].head(10)
-    df_aux03 = df2.loc[df2['City'] == 'Semi-Urban', :].head(10)
-
-    df3 = pd.concat([df_aux01, df_aux02, df_aux03]).reset_index(drop=True)
-    return df3
+st.set_page_config( page_title="Visão Entregadores", layout="wide")
+start_run('entregadores', enabled=st.session_state.get('debug_tempos', False))
 
 #-------------------------------------
 #----------Início da Logica-----------
 #-------------------------------------
-value = datetime(2022, 4, 13)
-
-df = pd.read_csv("dataset/train.csv")
-
-df1 = df.copy()
-
-# LIMPEZA
-df1 = clean_code(df)
+value = DATA_LIMITE_PADRAO
 
 #======================= SIDEBAR =======================#
 
@@ -103,7 +29,7 @@ st.sidebar.markdown('## Selecione uma data limite')
 # 🔥 CORREÇÃO 1 — Texto alterado conforme pedido
 data_slider = st.sidebar.slider(
     'Até que data?',
-    value=datetime(2022, 4, 13),
+    value=DATA_LIMITE_PADRAO,
     min_value=datetime(2022, 2, 11),
     max_value=datetime(2022, 4, 6),
     format='DD-MM-YYYY'
@@ -111,7 +37,7 @@ data_slider = st.sidebar.slider(
 st.sidebar.markdown("""---""")
 
 # 🔥 CORREÇÃO 2 — FILTRO DE CIDADE (NOVO)
-city_list = sorted(df1['City'].dropna().unique())
+city_list = available_cities()
 city_filter = st.sidebar.multiselect(
     "Filtrar por cidade",
     options=city_list,
@@ -122,32 +48,21 @@ st.sidebar.markdown("""---""")
 # === SIDEBAR: multiselect com default como lista
 traffic_options = st.sidebar.multiselect(
     'Quais as condições de trânsito',
-    ['Low', 'Medium', 'High', 'Jam'],
-    default=['Low']
+    TRAFFIC_OPTIONS,
+    default=TRANSITO_PADRAO
 )
-
 st.sidebar.markdown("""---""")
-st.sidebar.markdown('Powered By Pedro Oliveira')
 
-# === FILTRO DE DATA
-df1 = df1[df1['Order_Date'] < data_slider].copy()
+# === TAMANHO DOS RANKINGS DE VELOCIDADE (POR CIDADE)
+top_k = st.sidebar.slider('Entregadores por cidade no ranking', min_value=1, max_value=50, value=TOP_K)
 
-# Normalizar trânsito
-df1['Road_traffic_density'] = (
-    df1['Road_traffic_density']
-        .astype('string')
-        .str.strip()
-        .str.capitalize()
-)
-
-# === FILTRO DE CIDADE (NOVO)
-if city_filter:
-    df1 = df1[df1['City'].isin(city_filter)].copy()
+st.sidebar.markdown("""---""")
+st.sidebar.caption(status_text(start_warmup()))
+st.sidebar.checkbox('Medir tempos (debug)', key='debug_tempos')
+st.sidebar.markdown('Powered By Pedro Oliveira')
 
-# === FILTRO DE TRANSITO
-if traffic_options:
-    normalized_options = [opt.capitalize() for opt in traffic_options]
-    df1 = df1[df1['Road_traffic_density'].isin(normalized_options)].copy()
+# === MÉTRICAS PARA OS FILTROS DE DATA, CIDADE E TRANSITO
+metricas = courier_metrics(make_filters(data_slider, city_filter, traffic_options), k=top_k)
 
 #======================= LAYOUT STREAMLIT =======================#
 
@@ -156,63 +71,72 @@ st.header('Marketplace - Visão Entregadores')
 tab1, tab2, tab3 = st.tabs(['Visão Gerencial', '_', '_'])
 
 with tab1:
-    with st.container():
+    with st.container(), timer('render:overall'):
         st.title('Overall Metrics')
         col1, col2, col3, col4 = st.columns(4, gap='medium')
 
         with col1:
-            maior_idade = df1['Delivery_person_Age'].max()
+            maior_idade = metricas['maior_idade']
             col1.metric('Maior Idade', maior_idade)
 
         with col2:
-            menor_idade = df1['Delivery_person_Age'].min()
+            menor_idade = metricas['menor_idade']
             col2.metric('Menor Idade', menor_idade)
 
         with col3:
-            melhor_cond = df1['Vehicle_condition'].max()
+            melhor_cond = metricas['melhor_condicao']
             col3.metric('Melhor Condição', melhor_cond)
 
         with col4:
-            pior_cond = df1['Vehicle_condition'].min()
+            pior_cond = metricas['pior_condicao']
             col4.metric('Pior Condição', pior_cond)
 
-    with st.container():
+    with st.container(), timer('render:ratings'):
         st.markdown("""---""")
         st.title('Ratings')
 
         col1, col2 = st.columns(2, gap='medium')
 
         with col1:
-            st.markdown('##### Avaliações médias por entregador')
-            media_avaliacao_por_entregador = (
-                df1.groupby('Delivery_person_ID')['Delivery_person_Ratings']
-                .mean()
-                .reset_index()
-            )
-            st.dataframe(media_avaliacao_por_entregador)
-
-        with col2:
             st.markdown('##### Avaliações médias por transito')
-            av_media_transito = (
-                df1.loc[:, ['Delivery_person_Ratings', 'Road_traffic_density']]
-                .groupby('Road_traffic_density')
-                .agg({'Delivery_person_Ratings': ['mean']})
-            )
-            av_media_transito = av_media_transito.reset_index()
-            st.dataframe(av_media_transito)
+            st.dataframe(metricas['ratings_by_traffic'])
 
+        with col2:
             st.markdown('##### Avaliações médias por clima')
-            av_media_clima = (
-                df1.groupby('Weather_clean')
-                .agg({'Delivery_person_Ratings': ['mean']})
-            )
-            av_media_clima = av_media_clima.reset_index()
-            st.dataframe(av_media_clima)
+            st.dataframe(metricas['ratings_by_weather'])
+
+    # === PERFIS DOS ENTREGADORES (PAGINADO NO SERVIDOR)
+    with st.container(), timer('render:perfis'):
+        st.markdown('##### Perfil dos entregadores')
+        col1, col2 = st.columns([3, 1], gap='medium')
+        busca = col1.text_input('Buscar entregador (ID)', placeholder='ex.: DEL01')
+        pagina = col2.number_input('Página', min_value=1, value=1, step=1)
+
+        perfis = courier_profiles(busca, int(pagina))
+        st.dataframe(perfis['perfis'])
+        st.caption(
+            f"{perfis['encontrados']} entregadores · página {perfis['pagina']} de {perfis['paginas']} · "
+            "todos os pedidos (sem os filtros do sidebar)"
+        )
+
+# ============================================
+# PERCENTIS DO TEMPO DE ENTREGA
+# ============================================
+with st.container(), timer('render:percentis'):
+    st.markdown("""---""")
+    st.title('Percentis do Tempo de Entrega')
+
+    percentis = metricas['time_percentiles']
+    for col, p in zip(st.columns(3, gap='medium'), ['p50', 'p90', 'p99']):
+        col.metric(f'{p.upper()} (min)', percentis[p], help=f"{int(percentis['count'])} pedidos com tempo de entrega")
+
+    st.markdown('##### Percentis por transito')
+    st.dataframe(metricas['time_percentiles_by_traffic'], hide_index=True)
 
 # ============================================
 # ENTREGADORES MAIS RÁPIDOS E MAIS LENTOS
 # ============================================
-with st.container():
+with st.container(), timer('render:velocidade'):
     st.markdown("""---""")
     st.title('Velocidade de Entrega')
 
@@ -220,10 +144,16 @@ with st.container():
 
     with col1:
         st.markdown('##### Top Entregadores mais rápidos')
-        df3 = top_delivery(df1, top_asc=True)
-        st.dataframe(df3)
+        st.dataframe(metricas['fastest'])
 
     with col2:
         st.markdown('##### Top Entregadores mais lentos')
-        df3 = top_delivery(df1, top_asc=False)
-        st.dataframe(df3)
+        st.dataframe(metricas['slowest'])
+
+# === TEMPOS DESTE RERUN (DEBUG)
+relatorio = finish_run()
+if relatorio is not None:
+    with st.sidebar.expander('Tempos deste rerun'):
+        st.caption(f"Total: {relatorio['seconds']:.3f}s")
+        st.dataframe(pd.DataFrame(relatorio['records']))
+        st.download_button('Exportar (JSON lines)', to_jsonl(relatorio), file_name='tempos.jsonl')
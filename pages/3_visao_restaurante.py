@@ -1,73 +1,29 @@
 import plotly.express as px
 import pandas as pd
-from haversine import haversine
 import numpy as np
 import streamlit as st
 from datetime import datetime
 from PIL import Image
 import plotly.graph_objects as go
 
+from utils.metrics import TRAFFIC_OPTIONS, available_cities, make_filters, restaurant_metrics
+from utils.profiling import finish_run, start_run, timer, to_jsonl
+from utils.sketch import hll_error
+from utils.warmup import DATA_LIMITE_PADRAO, TRANSITO_PADRAO, start_warmup, status_text
+
 st.set_page_config( page_title="Visão Restaurante", layout="wide")
+start_run('restaurante', enabled=st.session_state.get('debug_tempos', False))
 
 # ---------------- FUNÇÕES ----------------
-def clean_code(df1):
-    # Limpar idade
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(str).str.strip()
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].replace(['NaN', '', 'NaN '], np.nan)
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype(float).astype('Int64')
-
-    # Transformar data em datetime (forçando coerção)
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y', errors='coerce')
-    df1 = df1.dropna(subset=['Order_Date']).copy()
-    df1['week_of_year'] = df1['Order_Date'].dt.isocalendar().week.astype(int)
-
-    # Ratings
-    df1['Delivery_person_Ratings'] = pd.to_numeric(df1['Delivery_person_Ratings'], errors='coerce')
-
-    # Limpar City
-    df1['City'] = df1['City'].astype('string').str.strip().replace({'NaN': np.nan, 'nan': np.nan, 'NULL': np.nan, 'null': np.nan, '': np.nan})
-
-    # Limpar Festival
-    df1['Festival'] = df1['Festival'].astype('string').str.strip().str.capitalize().replace({'Nan': np.nan, '': np.nan})
-
-    # Limpar Weatherconditions -> Weather_clean
-    s = df1['Weatherconditions'].astype('string').str.strip()
-    s = s.replace(['conditions NaN', 'NaN', 'nan', 'None', 'none', ''], pd.NA)
-    s = s.str.replace(r'^conditions\s+', '', regex=True)
-    df1['Weather_clean'] = s
-
-    # Time_taken(min)
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].astype(str).str.extract('(\d+)')
-    df1['Time_taken(min)'] = pd.to_numeric(df1['Time_taken(min)'], errors='coerce')
-
-    return df1
-
-def distance(df1):
-    cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Restaurant_latitude', 'Restaurant_longitude']
-    df1['distance'] = df1.loc[:, cols].apply(
-        lambda x: haversine(
-            (x['Restaurant_latitude'], x['Restaurant_longitude']),
-            (x['Delivery_location_latitude'], x['Delivery_location_longitude'])
-        ), axis=1
-    )
-    return np.round(df1['distance'].mean(), 2)
-
-def mostrar_metricas_filtro(df, filtro_col, valor_col, col_sim, col_nao, label_sim='Com', label_nao='Sem'):
-    filtro_sim = df[filtro_col] == 'Yes'
-    filtro_nao = df[filtro_col] == 'No'
-
-    media_sim = np.round(df.loc[filtro_sim, valor_col].mean(), 2)
-    std_sim = np.round(df.loc[filtro_sim, valor_col].std(), 2)
-    media_nao = np.round(df.loc[filtro_nao, valor_col].mean(), 2)
-    std_nao = np.round(df.loc[filtro_nao, valor_col].std(), 2)
-
-    col_sim.metric(f'Temp. Médio ({label_sim})', media_sim)
-    col_sim.metric(f'Desv. Padrão ({label_sim})', std_sim)
-    col_nao.metric(f'Temp. Médio ({label_nao})', media_nao)
-    col_nao.metric(f'Desv. Padrão ({label_nao})', std_nao)
-
-def avg_std_time_graph(df1, fig_height=420):
-    tempo_std = df1.groupby('City')['Time_taken(min)'].agg(['mean', 'std']).reset_index()
+# Os cálculos ficam em utils.metrics; aqui apenas widgets e gráficos.
+def mostrar_metricas_filtro(stats, col_sim, col_nao, label_sim='Com', label_nao='Sem'):
+    col_sim.metric(f'Temp. Médio ({label_sim})', stats.loc['Yes', 'mean'])
+    col_sim.metric(f'Desv. Padrão ({label_sim})', stats.loc['Yes', 'std'])
+    col_nao.metric(f'Temp. Médio ({label_nao})', stats.loc['No', 'mean'])
+    col_nao.metric(f'Desv. Padrão ({label_nao})', stats.loc['No', 'std'])
+
+def avg_std_time_graph(tempo_std, fig_height=420):
+    tempo_std = tempo_std.copy()
     tempo_std.columns = ['City', 'Tempo Médio', 'Desvio Padrão']
     fig = go.Figure()
     fig.add_trace(
@@ -81,11 +37,19 @@ def avg_std_time_graph(df1, fig_height=420):
     fig.update_layout(barmode='group', height=fig_height, autosize=False, margin=dict(t=40, b=40, l=20, r=20))
     return fig
 
-# ---------------- MAIN ----------------
-df = pd.read_csv("dataset/train.csv")
+def percentis_graph(percentis, fig_height=420):
+    df_aux = percentis.melt(id_vars='City', value_vars=['p50', 'p90', 'p99'], var_name='Percentil', value_name='Tempo')
+    fig = px.bar(df_aux, x='City', y='Tempo', color='Percentil', barmode='group', height=fig_height)
+    fig.update_layout(margin=dict(t=40, b=40, l=20, r=20))
+    return fig
 
-df1 = clean_code(df)
+def distribuicao_graph(distribuicao, fig_height=420):
+    fig = px.bar(distribuicao, x='minutes', y='orders', color='Festival', height=fig_height,
+                 labels={'minutes': 'Tempo de entrega (min)', 'orders': 'Pedidos'})
+    fig.update_layout(margin=dict(t=40, b=40, l=20, r=20))
+    return fig
 
+# ---------------- MAIN ----------------
 # ---------------- SIDEBAR ----------------
 Image = Image.open('curry_companyPNG.png')
 
@@ -97,7 +61,7 @@ st.sidebar.markdown("""---""")
 
 data_slider = st.sidebar.slider(
     'Até que data?',
-    value=datetime(2022, 4, 13),
+    value=DATA_LIMITE_PADRAO,
     min_value=datetime(2022, 2, 11),
     max_value=datetime(2022, 4, 6),
     format='DD-MM-YYYY'
@@ -106,8 +70,8 @@ st.sidebar.markdown("""---""")
 
 traffic_options = st.sidebar.multiselect(
     'Quais as condições de trânsito',
-    ['Low', 'Medium', 'High', 'Jam'],
-    default=['Low']
+    TRAFFIC_OPTIONS,
+    default=TRANSITO_PADRAO
 )
 
 # --------------------  
@@ -115,23 +79,17 @@ traffic_options = st.sidebar.multiselect(
 # --------------------
 city_options = st.sidebar.multiselect(
     'Selecione as cidades',
-    options=df1['City'].dropna().unique().tolist(),
-    default=df1['City'].dropna().unique().tolist()
+    options=available_cities(),
+    default=available_cities()
 )
 
 st.sidebar.markdown("""---""")
+st.sidebar.caption(status_text(start_warmup()))
+st.sidebar.checkbox('Medir tempos (debug)', key='debug_tempos')
 st.sidebar.markdown('Powered By Pedro Oliveira')
 
 # ---------------- FILTROS ----------------
-df1 = df1[df1['Order_Date'] < data_slider].copy()
-df1['Road_traffic_density'] = df1['Road_traffic_density'].astype('string').str.strip().str.capitalize()
-if traffic_options:
-    normalized_options = [opt.capitalize() for opt in traffic_options]
-    df1 = df1[df1['Road_traffic_density'].isin(normalized_options)].copy()
-
-# ✔️ aplicar filtro cidade
-if city_options:
-    df1 = df1[df1['City'].isin(city_options)].copy()
+metricas = restaurant_metrics(make_filters(data_slider, city_options, traffic_options))
 
 # ---------------- LAYOUT ----------------
 st.header('Marketplace - Visão Restaurantes')
@@ -139,20 +97,28 @@ tab1, tab2, tab3 = st.tabs(['Visão Gerencial', '_', '_'])
 
 with tab1:
     # Overall Metrics
-    with st.container():
+    with st.container(), timer('render:overall'):
         st.title('Overall Metrics')
-        col1, col2 = st.columns(2, gap='medium')
-        col1.metric('Ent. Únicos', df1['Delivery_person_ID'].count())
-        col2.metric('Dist. Média', distance(df1))
+        if metricas['distintos_exatos']:
+            ajuda_distintos = 'Contagem exata'
+        else:
+            ajuda_distintos = f'Estimativa (erro típico de ±{hll_error():.1%})'
+        col1, col2, col3, col4 = st.columns(4, gap='medium')
+        col1.metric('Ent. Únicos', metricas['entregadores'], help=ajuda_distintos)
+        col2.metric('Restaurantes', metricas['restaurantes'],
+                    help=f'{ajuda_distintos}; restaurantes identificados pelas coordenadas válidas')
+        col3.metric('Dist. Média', metricas['distancia_media'],
+                    help=f"{metricas['coordenadas_invalidas']} pedidos com coordenadas inválidas fora da média")
+        col4.metric('Preparo Médio (min)', metricas['preparo_medio'])
         st.markdown("""---""")
 
         col3, col4, col5, col6 = st.columns(4, gap='medium')
-        mostrar_metricas_filtro(df1, 'Festival', 'Time_taken(min)', col3, col5, label_sim='f', label_nao='s/F')
+        mostrar_metricas_filtro(metricas['festival'], col3, col5, label_sim='f', label_nao='s/F')
 
     # Distribution of Orders by City (Pie)
-    with st.container():
+    with st.container(), timer('render:pedidos_por_cidade'):
         st.title('Distribuição de Pedidos por Cidade (%)')
-        counts = df1['City'].value_counts()
+        counts = metricas['orders_by_city']
         labels, values = counts.index.tolist(), counts.values.tolist()
         min_idx = int(values.index(min(values)))
         pull = [0.0]*len(values)
@@ -167,25 +133,39 @@ with tab1:
 
     # Time Distribution
     fig_height = 420
-    with st.container():
+    with st.container(), timer('render:time_distribution'):
         st.title('Time Distribution')
         col1, col2 = st.columns(2)
         with col1:
             st.markdown('##### Tempo médio e desvio padrão por cidade')
-            st.plotly_chart(avg_std_time_graph(df1, fig_height), use_container_width=True)
+            st.plotly_chart(avg_std_time_graph(metricas['time_by_city'], fig_height), use_container_width=True)
 
         with col2:
             st.markdown('##### Tempo médio por tipo de entrega')
-            tabela_tempo_tipo = df1.groupby('Type_of_order')['Time_taken(min)'].mean().reset_index().rename(columns={'Time_taken(min)': 'Tempo_medio'})
+            tabela_tempo_tipo = metricas['time_by_order_type'].loc[:, ['Type_of_order', 'mean']].rename(columns={'mean': 'Tempo_medio'})
             st.dataframe(tabela_tempo_tipo, height=fig_height)
 
+    # Percentis do tempo de entrega (cauda da distribuição)
+    with st.container(), timer('render:percentis'):
+        st.title('Percentis do Tempo de Entrega')
+        percentis = metricas['time_percentiles']
+        for col, p in zip(st.columns(3, gap='medium'), ['p50', 'p90', 'p99']):
+            col.metric(f'{p.upper()} (min)', percentis[p], help=f"{int(percentis['count'])} pedidos com tempo de entrega")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown('##### Percentis por cidade')
+            st.plotly_chart(percentis_graph(metricas['time_percentiles_by_city'], fig_height), use_container_width=True)
+
+        with col2:
+            st.markdown('##### Distribuição do tempo de entrega (com e sem festival)')
+            st.plotly_chart(distribuicao_graph(metricas['time_distribution'], fig_height), use_container_width=True)
+
     # Distance Distribution (Sunburst)
-    with st.container():
+    with st.container(), timer('render:distance_distribution'):
         st.title('Distance Distribution')
-        cols = ['City', 'Time_taken(min)', 'Road_traffic_density']
-        df_aux = df1.loc[:, cols].groupby(['City', 'Road_traffic_density']).agg({'Time_taken(min)': ['mean', 'std']})
-        df_aux.columns = ['avg_time', 'std_time']
-        df_aux = df_aux.reset_index()
+        df_aux = metricas['time_by_city_traffic'].copy()
+        df_aux.columns = ['City', 'Road_traffic_density', 'avg_time', 'std_time']
         fig = px.sunburst(
             df_aux,
             path=['City', 'Road_traffic_density'],
@@ -195,3 +175,11 @@ with tab1:
             color_continuous_midpoint=np.average(df_aux['std_time'])
         )
         st.plotly_chart(fig)
+
+# === TEMPOS DESTE RERUN (DEBUG)
+relatorio = finish_run()
+if relatorio is not None:
+    with st.sidebar.expander('Tempos deste rerun'):
+        st.caption(f"Total: {relatorio['seconds']:.3f}s")
+        st.dataframe(pd.DataFrame(relatorio['records']))
+        st.download_button('Exportar (JSON lines)', to_jsonl(relatorio), file_name='tempos.jsonl')
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import activity
+from utils.activity import COURIER, KEYS, build_activity
+from utils.sketch import RESTAURANT_DECIMALS, hll_error
+
+# Tolerância das estimativas HLL: 3 erros padrão relativos
+TOLERANCE = 3 * hll_error()
+
+
+def orders(n=60000, couriers=20000, restaurants=8000, seed=0):
+    """Pedidos já limpos (só as colunas do store), com muitos distintos."""
+    rng = np.random.default_rng(seed)
+    rest = rng.integers(0, restaurants, n)
+    df = pd.DataFrame({
+        'Order_Date': pd.Timestamp('2022-02-11') + pd.to_timedelta(rng.integers(0, 50, n), unit='D'),
+        'City': pd.Series(rng.choice(['Urban', 'Metropolitian', 'Semi-Urban'], n)).astype('category'),
+        'Road_traffic_density': pd.Series(rng.choice(['Low', 'Medium', 'High', 'Jam'], n)).astype('category'),
+        COURIER: pd.Series([f'DEL{i:06d}' for i in rng.integers(0, couriers, n)]).astype('category'),
+        'Restaurant_latitude': np.round(10 + rest * 0.002, RESTAURANT_DECIMALS),
+        'Restaurant_longitude': np.round(70 + rest * 0.0015, RESTAURANT_DECIMALS),
+        'coord_status': pd.Series(np.where(rng.random(n) < 0.01, 'zero', 'ok')).astype('category'),
+    })
+    return df.sort_values('Order_Date', kind='stable', ignore_index=True)
+
+
+def exact_counts(df):
+    valid = df['coord_status'] == 'ok'
+    restaurants = df.loc[valid, ['Restaurant_latitude', 'Restaurant_longitude']].drop_duplicates()
+    return {'couriers': df[COURIER].nunique(), 'restaurants': len(restaurants)}
+
+
+@pytest.fixture
+def sketch_only(monkeypatch):
+    # Limite baixo: nenhuma entidade fica no modo exato
+    monkeypatch.setattr(activity, 'EXACT_MAX_DISTINCT', 100)
+
+
+def test_exact_mode_counts_exactly():
+    df = orders(n=5000)
+    store = build_activity(df)
+    for entity, expected in exact_counts(df).items():
+        assert store.is_exact(entity)
+        assert store.distinct(entity) == expected
+
+
+def test_sketch_estimates_within_error(sketch_only):
+    df = orders()
+    store = build_activity(df)
+
+    for entity, expected in exact_counts(df).items():
+        assert not store.is_exact(entity)
+        assert store.distinct(entity) == pytest.approx(expected, rel=TOLERANCE)
+
+    for city in ['Urban', 'Semi-Urban']:
+        subset = df[df['City'] == city]
+        estimate = store.filter(cidades=[city]).distinct('couriers')
+        assert estimate == pytest.approx(subset[COURIER].nunique(), rel=TOLERANCE)
+
+    weekly = store.weekly()
+    iso = df['Order_Date'].dt.isocalendar()
+    expected = df.groupby([iso['year'], iso['week']])[COURIER].nunique().to_numpy()
+    np.testing.assert_allclose(weekly['couriers'], expected, rtol=TOLERANCE)
+
+
+def test_sketch_merge_matches_rebuild(sketch_only):
+    df = orders(seed=1)
+    merged = build_activity(df.iloc[:40000]).merge(df.iloc[40000:])
+    rebuilt = build_activity(df)
+
+    pd.testing.assert_frame_equal(merged.cells, rebuilt.cells, check_categorical=False)
+    for entity in rebuilt.registers:
+        assert not merged.is_exact(entity)
+        assert np.array_equal(merged.registers[entity], rebuilt.registers[entity])
+        assert merged.distinct(entity) == rebuilt.distinct(entity)
+    pd.testing.assert_frame_equal(merged.weekly(), rebuilt.weekly())
+    pd.testing.assert_frame_equal(merged.rolling(), rebuilt.rolling())
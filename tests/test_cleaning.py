@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_orders
+from utils import cleaning
+from utils.cleaning import clean_code, parse_hms
+
+COLUMNS = [
+    'ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings',
+    'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude',
+    'Delivery_location_longitude', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+    'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'Type_of_order',
+    'Type_of_vehicle', 'multiple_deliveries', 'Festival', 'City', 'Time_taken(min)',
+]
+
+# Linhas no formato do train.csv, com as sujeiras reais do arquivo
+ROWS = [
+    ['0x4607 ', 'INDORES13DEL02 ', '37', '4.9', '22.745049', '75.892471', '22.765049', '75.912471',
+     '19-03-2022', '11:30:00', '11:45:00', 'conditions Sunny', 'High ', '2', 'Snack ',
+     'motorcycle ', '0', 'No ', 'Urban ', '(min) 24'],
+    ['0xb379 ', 'BANGRES18DEL02 ', 'NaN ', 'NaN ', '12.913041', '77.683237', '13.043041', '77.813237',
+     '25-03-2022', 'NaN ', '19:50:00', 'conditions NaN', 'NaN ', '2', 'Meal ',
+     'scooter ', 'NaN ', 'NaN ', 'NaN ', '(min) 33'],
+    ['0x5d6d ', 'COIMBRES13DEL02 ', '23', '4.4', '-11.003669', '-76.976494', '11.053669', '77.026494',
+     '13-02-2022', '23:55:00', '0:05:00', 'conditions Stormy', 'Jam ', '0', 'Drinks ',
+     'motorcycle ', '1', 'Yes ', 'Metropolitian ', '(min) 40'],
+    ['0x7a6a ', 'CHENRES12DEL01 ', '38', '4.7', '0.0', '0.0', '0.07', '0.07',
+     '02-30-2022', '09:05:00', '09:15:00', 'conditions Fog', 'low ', '1', 'Buffet ',
+     'motorcycle ', '1', 'no ', 'Semi-Urban ', '(min) 21'],
+    ['0x9bb4 ', 'CHENRES19DEL01 ', '22', '4.5', '0.0', '0.0', '0.05', '0.05',
+     '01-03-2022', '9:05:00', '9:20:00', 'conditions Fog', 'Medium ', '1', 'Buffet ',
+     'motorcycle ', '1', 'No ', 'Urban ', '(min) 30'],
+]
+
+
+@pytest.fixture
+def clean():
+    raw = pd.DataFrame(ROWS, columns=COLUMNS, dtype=str)
+    return clean_code(raw)
+
+
+def test_drops_bad_dates_and_sorts_by_date(clean):
+    assert len(clean) == 4
+    assert clean['Order_Date'].is_monotonic_increasing
+    assert clean['ID'].tolist() == ['0x5d6d', '0x9bb4', '0x4607', '0xb379']
+
+
+def test_null_strings_and_trimmed_categories(clean):
+    row = clean.set_index('ID').loc['0xb379']
+    assert pd.isna(row['Delivery_person_Age'])
+    assert pd.isna(row['Delivery_person_Ratings'])
+    assert pd.isna(row['multiple_deliveries'])
+    assert pd.isna(row['Weather_clean'])
+    assert pd.isna(row['Road_traffic_density'])
+    assert pd.isna(row['City'])
+    assert pd.isna(row['Festival'])
+    assert pd.isna(row['Time_Orderd'])
+
+    assert set(clean['City'].dropna()) == {'Urban', 'Metropolitian'}
+    assert set(clean['Road_traffic_density'].dropna()) == {'High', 'Jam', 'Medium'}
+    assert set(clean['Festival'].dropna()) == {'No', 'Yes'}
+    assert set(clean['Weather_clean'].dropna()) == {'Sunny', 'Stormy', 'Fog'}
+    assert clean['Delivery_person_ID'].iloc[0] == 'COIMBRES13DEL02'
+
+
+def test_numeric_values(clean):
+    clean = clean.set_index('ID')
+    assert clean['Time_taken(min)'].tolist() == [40.0, 30.0, 24.0, 33.0]
+    assert clean.loc['0x4607', 'Delivery_person_Age'] == 37
+    assert clean.loc['0x4607', 'prep_time'] == 15.0
+    # Coleta depois da meia-noite
+    assert clean.loc['0x5d6d', 'prep_time'] == 10.0
+    assert bool(clean.loc['0x5d6d', 'picked_next_day'])
+    # Horário fora do formato fixo
+    assert clean.loc['0x9bb4', 'Time_Orderd'] == 9 * 3600 + 5 * 60
+
+
+def test_coordinates(clean):
+    clean = clean.set_index('ID')
+    assert clean.loc['0x4607', 'coord_status'] == 'ok'
+    assert clean.loc['0x5d6d', 'coord_status'] == 'sign_repaired'
+    assert clean.loc['0x5d6d', 'Restaurant_latitude'] == pytest.approx(11.003669)
+    assert clean.loc['0x9bb4', 'coord_status'] == 'zero'
+    assert pd.isna(clean.loc['0x9bb4', 'distancia_km'])
+    assert clean.loc['0x4607', 'distancia_km'] == pytest.approx(3.0, abs=0.1)
+
+
+def test_compact_dtypes(clean):
+    for col in ['Delivery_person_ID', 'City', 'Road_traffic_density', 'Weather_clean',
+                'Type_of_order', 'Type_of_vehicle', 'Festival', 'coord_status']:
+        assert isinstance(clean[col].dtype, pd.CategoricalDtype), col
+    for col in ['Delivery_person_Age', 'Vehicle_condition', 'multiple_deliveries']:
+        assert clean[col].dtype == 'Int8', col
+    for col in ['Delivery_person_Ratings', 'Restaurant_latitude', 'Time_taken(min)',
+                'prep_time', 'distancia_km']:
+        assert clean[col].dtype == np.float32, col
+    assert clean['week_of_year'].dtype == np.int8
+    assert clean['Time_Orderd'].dtype == 'Int32'
+    assert 'Weatherconditions' not in clean
+
+
+def test_parse_hms_edge_cases():
+    s = pd.Series(['11:30:00', '9:05:00', '24:00:00', np.nan, 'NaN', '00:00:59'], index=[5, 6, 7, 8, 9, 10])
+    out = parse_hms(s)
+    assert out.dtype == 'Int32'
+    assert out.index.tolist() == s.index.tolist()
+    assert out[5] == 11 * 3600 + 30 * 60
+    assert out[6] == 9 * 3600 + 5 * 60
+    assert pd.isna(out[7])
+    assert pd.isna(out[8])
+    assert pd.isna(out[9])
+    assert out[10] == 59
+
+
+def test_clean_parallel_matches_clean_code(monkeypatch):
+    monkeypatch.setattr(cleaning, 'PARALLEL_MIN_ROWS', 0)
+    raw = synthetic_orders(3000, seed=5)
+    pd.testing.assert_frame_equal(cleaning.clean_parallel(raw, workers=2), clean_code(raw))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.histogram import MAX_MINUTES, MEASURE, build_histograms, merge_histograms, percentiles
+
+QS = [.5, .9, .99]
+
+
+def orders(n=5000, high=56, seed=0):
+    """Pedidos já limpos (só as colunas dos histogramas), com nulos nas chaves e no tempo."""
+    rng = np.random.default_rng(seed)
+
+    def category(values, null_share=0.02):
+        col = pd.Series(rng.choice(values, n)).astype('category')
+        return col.mask(rng.random(n) < null_share)
+
+    df = pd.DataFrame({
+        'Order_Date': pd.Timestamp('2022-02-11') + pd.to_timedelta(rng.integers(0, 50, n), unit='D'),
+        'City': category(['Urban', 'Metropolitian', 'Semi-Urban']),
+        'Road_traffic_density': category(['Low', 'Medium', 'High', 'Jam']),
+        'Festival': category(['Yes', 'No']),
+    })
+    # Tempo de entrega em minutos inteiros, como no dataset limpo
+    df[MEASURE] = pd.Series(rng.integers(10, high, n), dtype=np.float32).mask(rng.random(n) < 0.05)
+    return df
+
+
+def expected(df, by):
+    """Contagem e percentis do pandas (interpolação linear), uma linha por grupo."""
+    if not by:
+        col = df[MEASURE]
+        return np.array([[col.count()]]), col.quantile(QS).to_numpy()[None, :]
+    grouped = df.groupby(by, observed=True)[MEASURE]
+    return grouped.count().to_numpy()[:, None], grouped.quantile(QS).unstack().to_numpy()
+
+
+def check(hist, df, by):
+    out = percentiles(hist, by)
+    count, values = expected(df, by)
+    assert (out[['count']].to_numpy() == count).all()
+    np.testing.assert_allclose(out[['p50', 'p90', 'p99']].to_numpy(), values, rtol=1e-12)
+
+
+@pytest.mark.parametrize('by', [[], ['City'], ['City', 'Road_traffic_density'], ['Festival']])
+def test_percentiles_match_pandas(by):
+    df = orders()
+    check(build_histograms(df), df, by)
+
+
+def test_times_above_max_minutes_are_clamped():
+    df = orders(high=MAX_MINUTES + 40, seed=1)
+    assert (df[MEASURE] > MAX_MINUTES).any()
+    hist = build_histograms(df)
+
+    # Os tempos acima do limite caem no último bin: os percentis são os do
+    # tempo limitado a MAX_MINUTES...
+    clamped = df.assign(**{MEASURE: df[MEASURE].clip(upper=MAX_MINUTES)})
+    check(hist, clamped, ['City'])
+
+    # ...e iguais aos exatos enquanto ficam abaixo do limite
+    out = percentiles(hist, ['City'])
+    _, exact = expected(df, ['City'])
+    np.testing.assert_allclose(out['p50'], exact[:, 0], rtol=1e-12)
+    assert (out['p99'] <= MAX_MINUTES).all() and (exact[:, 2] > MAX_MINUTES).all()
+
+
+def test_merge_matches_full_build():
+    df = orders(seed=2)
+    # Uma cidade que só aparece nos pedidos novos
+    df['City'] = df['City'].cat.add_categories('Rural')
+    df.loc[4500:, 'City'] = 'Rural'
+    old, new = df.iloc[:4000], df.iloc[4000:]
+
+    merged = merge_histograms(build_histograms(old), new)
+    pd.testing.assert_frame_equal(merged, build_histograms(df), check_categorical=False)
+    for by in [['City'], ['Festival']]:
+        check(merged, df, by)
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_orders
+from utils import data
+from utils.activity import load_activity
+from utils.couriers import load_courier_table, load_profiles
+from utils.histogram import load_histograms
+from utils.rollup import load_rollup
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def csv(tmp_path, monkeypatch):
+    """CSV com os primeiros pedidos e cache Parquet em diretório temporário."""
+    monkeypatch.setattr(data, 'CACHE_DIR', str(tmp_path / 'cache'))
+    data.clear_cache()
+    raw = synthetic_orders(4000, seed=1)
+    # Entregadores cujos pedidos não têm cidade, um nos pedidos iniciais e
+    # outro nos novos
+    for pos, courier in [(10, 'LONELY01 '), (3500, 'LONELY02 ')]:
+        raw.loc[pos, ['Delivery_person_ID', 'City']] = [courier, 'NaN ']
+    path = str(tmp_path / 'train.csv')
+    raw.iloc[:3000].to_csv(path, index=False)
+    yield path, raw.iloc[3000:]
+    data.clear_cache()
+
+
+def touch(path):
+    # Garante um mtime novo mesmo em sistemas de arquivos com pouca resolução
+    mtime = os.stat(path).st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime, mtime))
+
+
+def structures(path):
+    return {
+        'rollup': load_rollup(path),
+        'activity': load_activity(path),
+        'histograms': load_histograms(path),
+        'profiles': load_profiles(path),
+        'table': load_courier_table(path),
+    }
+
+
+def assert_same(merged, rebuilt):
+    pd.testing.assert_frame_equal(
+        merged['rollup'], rebuilt['rollup'], rtol=1e-9, check_categorical=False, check_like=True
+    )
+    pd.testing.assert_frame_equal(merged['profiles'], rebuilt['profiles'], rtol=1e-9)
+    pd.testing.assert_frame_equal(merged['table'], rebuilt['table'], check_categorical=False)
+    lonely = rebuilt['table'].index.str.startswith('LONELY')
+    assert lonely.any() and rebuilt['table'].loc[lonely, 'main_city'].isna().all()
+    pd.testing.assert_frame_equal(merged['histograms'], rebuilt['histograms'], check_categorical=False)
+
+    old, new = merged['activity'], rebuilt['activity']
+    pd.testing.assert_frame_equal(old.cells, new.cells, check_categorical=False)
+    for entity in new.registers:
+        assert (old.registers[entity] == new.registers[entity]).all()
+        assert old.is_exact(entity) and new.is_exact(entity)
+        for a, b in zip(old.sets[entity], new.sets[entity]):
+            assert np.array_equal(a, b)
+    pd.testing.assert_frame_equal(old.weekly(), new.weekly())
+    pd.testing.assert_frame_equal(old.rolling(), new.rolling())
+
+
+def rebuild(path):
+    # Mantém o Parquet já sincronizado e recalcula tudo a partir dele
+    data.clear_cache()
+    return structures(path)
+
+
+def test_append_matches_full_rebuild(csv):
+    path, new_rows = csv
+    before = structures(path)
+    assert len(before['histograms']) > 0
+
+    new_rows.to_csv(path, mode='a', header=False, index=False)
+    touch(path)
+    merged = structures(path)
+
+    # As estruturas vieram da atualização incremental, não de um rebuild
+    assert data._last_delta[os.path.abspath(path)][2] is not None
+    assert merged['rollup']['orders'].sum() > before['rollup']['orders'].sum()
+    assert len(data.load_data(path=path)) == merged['rollup']['orders'].sum()
+
+    assert_same(merged, rebuild(path))
+
+
+def test_touch_without_new_rows_matches_full_rebuild(csv):
+    path, _ = csv
+    before = structures(path)
+
+    touch(path)
+    merged = structures(path)
+    assert merged['rollup']['orders'].sum() == before['rollup']['orders'].sum()
+
+    assert_same(merged, rebuild(path))
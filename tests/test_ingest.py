@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_orders
+from utils import data
+from utils.cleaning import clean_code
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def csv(tmp_path, monkeypatch):
+    """Caminho do CSV e cache Parquet em diretório temporário."""
+    monkeypatch.setattr(data, 'CACHE_DIR', str(tmp_path / 'cache'))
+    data.clear_cache()
+    yield str(tmp_path / 'train.csv')
+    data.clear_cache()
+
+
+def write(path, text, mode='w'):
+    with open(path, mode, newline='') as f:
+        f.write(text)
+    # Garante um mtime novo mesmo em sistemas de arquivos com pouca resolução
+    mtime = os.stat(path).st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime, mtime))
+
+
+def expected(path):
+    return clean_code(pd.read_csv(path, dtype=str))
+
+
+def assert_loaded(path):
+    df1 = data.load_data(path=path)
+    pd.testing.assert_frame_equal(df1, expected(path), check_categorical=False)
+    return df1
+
+
+def test_last_line_without_newline(csv):
+    text = synthetic_orders(1000, seed=2).to_csv(index=False)
+    write(csv, text.rstrip('\n'))
+    assert len(pd.read_csv(csv)) == 1000
+    assert_loaded(csv)
+
+
+def test_append_after_last_line_without_newline(csv):
+    raw = synthetic_orders(1200, seed=3)
+    write(csv, raw.iloc[:1000].to_csv(index=False).rstrip('\n'))
+    assert_loaded(csv)
+
+    write(csv, '\n' + raw.iloc[1000:].to_csv(index=False, header=False), mode='a')
+    assert_loaded(csv)
+
+
+def test_line_still_being_written(csv):
+    raw = synthetic_orders(1200, seed=4)
+    text = raw.to_csv(index=False)
+    cut = text.index('\n', len(raw.iloc[:1000].to_csv(index=False))) - 10
+    write(csv, text[:cut])
+    data.load_data(path=csv)
+
+    # O resto da linha e as linhas seguintes chegam depois
+    write(csv, text[cut:], mode='a')
+    assert_loaded(csv)
+
+
+def test_parallel_ingest_matches_serial(csv):
+    write(csv, synthetic_orders(5000, seed=5).to_csv(index=False))
+
+    # Teto de memória baixo: vários blocos
+    total = data.ingest(csv, memory_limit_mb=1, workers=1)
+    serial = data.read_cache(csv)
+
+    assert data.ingest(csv, memory_limit_mb=1, workers=2) == total
+    assert data.read_state(csv)['parts'] > 1
+    pd.testing.assert_frame_equal(data.read_cache(csv), serial)
+    pd.testing.assert_frame_equal(serial, expected(csv), check_categorical=False)
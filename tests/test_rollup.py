@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.rollup import DIMENSIONS, MEASURES, build_rollup, reduce_rollup, summarize
+
+
+def orders(n=5000, offset=0.0, seed=0):
+    """Pedidos já limpos (só as colunas do cubo), com nulos nas dimensões e nas medidas."""
+    rng = np.random.default_rng(seed)
+
+    def category(values, null_share=0.02):
+        col = pd.Series(rng.choice(values, n)).astype('category')
+        return col.mask(rng.random(n) < null_share)
+
+    df = pd.DataFrame({
+        'Order_Date': pd.Timestamp('2022-02-11') + pd.to_timedelta(rng.integers(0, 50, n), unit='D'),
+        'City': category(['Urban', 'Metropolitian', 'Semi-Urban']),
+        'Road_traffic_density': category(['Low', 'Medium', 'High', 'Jam']),
+        'Weather_clean': category(['Sunny', 'Fog', 'Stormy']),
+        'Festival': category(['Yes', 'No']),
+        'Type_of_order': category(['Snack', 'Meal', 'Drinks', 'Buffet'], null_share=0),
+    })
+    for col in MEASURES.values():
+        values = pd.Series(offset + rng.uniform(10, 55, n))
+        df[col] = values.mask(rng.random(n) < 0.05)
+    return df[DIMENSIONS + list(MEASURES.values())]
+
+
+def check(df, by, rtol):
+    col = MEASURES['time']
+    out = summarize(build_rollup(df), by, 'time')
+    expected = df.groupby(by, observed=True)[col].agg(['count', 'mean', 'std']).reset_index()
+
+    assert out[by].equals(expected[by].astype(out[by].dtypes.to_dict()))
+    assert (out['count'].to_numpy() == expected['count'].to_numpy()).all()
+    np.testing.assert_allclose(out['mean'], expected['mean'], rtol=rtol)
+    np.testing.assert_allclose(out['std'], expected['std'], rtol=rtol)
+
+
+@pytest.mark.parametrize('by', [['City'], ['City', 'Road_traffic_density'], ['Festival'], ['Type_of_order']])
+def test_summarize_matches_pandas(by):
+    check(orders(), by, rtol=1e-12)
+
+
+def test_summarize_with_large_offset():
+    # Com soma dos quadrados (sumsq - sum²/n) o desvio padrão perderia todos
+    # os dígitos aqui; com M2 sobra só o arredondamento dos próprios valores
+    # (~1e-7 em 1e9)
+    check(orders(offset=1e9), ['City', 'Festival'], rtol=1e-8)
+
+
+def test_overall_total_keeps_null_dimensions():
+    df = orders()
+    out = summarize(build_rollup(df), [], 'time')
+    col = df[MEASURES['time']]
+    assert out['orders'].iloc[0] == len(df)
+    assert out['count'].iloc[0] == col.count()
+    assert out['mean'].iloc[0] == pytest.approx(col.mean(), rel=1e-12)
+    assert out['std'].iloc[0] == pytest.approx(col.std(), rel=1e-12)
+
+
+def test_reduced_cube_gives_same_result():
+    cube = build_rollup(orders())
+    reduced = reduce_rollup(cube, ['City', 'Festival'])
+    pd.testing.assert_frame_equal(
+        summarize(reduced, ['City'], 'time'),
+        summarize(cube, ['City'], 'time'),
+        rtol=1e-12
+    )
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from haversine import haversine
+
+from utils.spatial import SpatialIndex
+
+COORDS = ('lat', 'lon')
+
+
+@pytest.fixture(scope='module')
+def points():
+    """Pontos na faixa do dataset, com alguns sem coordenada."""
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        'lat': rng.uniform(10, 30, n),
+        'lon': rng.uniform(70, 88, n),
+        'time': rng.uniform(10, 55, n),
+    })
+    df.loc[rng.random(n) < 0.02, 'lat'] = np.nan
+    df['id'] = np.arange(n)
+    return df
+
+
+def brute_force(df, lat, lon):
+    """Distância de (lat, lon) a cada ponto com coordenada, ponto a ponto."""
+    df = df.dropna(subset=list(COORDS))
+    dist = [haversine((lat, lon), (a, b)) for a, b in zip(df['lat'], df['lon'])]
+    return df.assign(dist_km=dist).sort_values(['dist_km', 'id'])
+
+
+QUERIES = [(20.0, 80.0), (10.01, 70.01), (29.9, 87.9), (25.3, 75.05), (15.0, 95.0)]
+
+
+@pytest.mark.parametrize('lat, lon', QUERIES)
+@pytest.mark.parametrize('radius_km', [1, 25, 120, 600])
+def test_within_matches_brute_force(points, lat, lon, radius_km):
+    out = SpatialIndex(points, COORDS).within(lat, lon, radius_km)
+    expected = brute_force(points, lat, lon)
+    expected = expected[expected['dist_km'] <= radius_km]
+
+    assert sorted(out['id']) == sorted(expected['id'])
+    assert out['dist_km'].is_monotonic_increasing
+    np.testing.assert_allclose(out['dist_km'], expected['dist_km'], rtol=1e-9)
+
+
+@pytest.mark.parametrize('lat, lon', QUERIES)
+@pytest.mark.parametrize('k', [1, 5, 50])
+def test_nearest_matches_brute_force(points, lat, lon, k):
+    out = SpatialIndex(points, COORDS).nearest(lat, lon, k)
+    expected = brute_force(points, lat, lon).head(k)
+
+    assert len(out) == k
+    np.testing.assert_allclose(out['dist_km'], expected['dist_km'], rtol=1e-9)
+
+
+def test_nearest_with_more_points_than_indexed(points):
+    index = SpatialIndex(points.head(20), COORDS)
+    assert len(index.nearest(20.0, 80.0, k=100)) == len(index)
+
+
+def test_cell_stats_matches_groupby(points):
+    index = SpatialIndex(points, COORDS)
+    stats = index.cell_stats('time')
+
+    df = points.dropna(subset=list(COORDS))
+    cells = df.groupby([np.floor(df['lat'] / index.cell_deg), np.floor(df['lon'] / index.cell_deg)])['time']
+    expected = cells.agg(['size', 'mean', 'std'])
+
+    assert stats['orders'].sum() == len(df)
+    assert sorted(stats['orders']) == sorted(expected['size'])
+    np.testing.assert_allclose(np.sort(stats['mean']), np.sort(expected['mean']), rtol=1e-12)
@@ -0,0 +1 @@
+"""Funções compartilhadas pelas páginas do dashboard da Curry Company."""
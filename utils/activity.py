@@ -0,0 +1,271 @@
+"""
+Série diária de atividade: pedidos e entidades distintas (entregadores e
+restaurantes) por dia × City × Road_traffic_density.
+
+Cada entidade é identificada por um hash de 64 bits (utils.sketch):
+Delivery_person_ID para entregadores e as coordenadas arredondadas para
+restaurantes (só coordenadas válidas). Para cada célula o store guarda:
+- orders: quantidade de pedidos
+- um sketch HyperLogLog por entidade (`registers`), sempre
+- o conjunto exato (array ordenado de hashes) por entidade, enquanto a
+  entidade tiver até EXACT_MAX_DISTINCT valores (modo exato)
+
+Distintos de qualquer seleção de células (filtros do sidebar, semanas ISO,
+janelas móveis de 7/28 dias) saem da união dos conjuntos, ou dos sketches
+quando o modo exato foi desligado, sem voltar aos pedidos. Com linhas novas
+no CSV só os pedidos novos são agregados e mesclados.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import VALID_COORD_STATUS
+from utils.data import DATA_PATH, cached, load_data
+from utils.profiling import timed
+from utils.sketch import HLL_PRECISION, hash_coordinates, hash_values, hll_estimate, hll_registers
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+KEYS = ['Order_Date', 'City', 'Road_traffic_density']
+COURIER = 'Delivery_person_ID'
+RESTAURANT_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude', 'coord_status']
+
+ROLLING_WINDOWS = [7, 28]
+
+# Acima deste número de distintos a entidade passa a usar só os sketches
+EXACT_MAX_DISTINCT = 100_000
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def entity_hashes(df1):
+    """
+    {entidade: (hashes, válidos)} das entidades que `df1` permite
+    identificar; `válidos` marca as linhas com entidade conhecida.
+    """
+    entities = {}
+    if COURIER in df1:
+        ids = df1[COURIER]
+        entities['couriers'] = (hash_values(ids.astype(object).fillna('')), ids.notna().to_numpy())
+    if all(col in df1 for col in RESTAURANT_COLUMNS):
+        valid = df1['coord_status'].isin(VALID_COORD_STATUS).to_numpy()
+        entities['restaurants'] = (
+            hash_coordinates(df1['Restaurant_latitude'], df1['Restaurant_longitude']),
+            valid,
+        )
+    return entities
+
+
+def _split_sets(gid, hashes, n_groups):
+    """Array ordenado de hashes distintos de cada grupo."""
+    order = np.lexsort((hashes, gid))
+    gid, hashes = gid[order], hashes[order]
+    keep = np.ones(len(gid), dtype=bool)
+    keep[1:] = (gid[1:] != gid[:-1]) | (hashes[1:] != hashes[:-1])
+    gid, hashes = gid[keep], hashes[keep]
+    return np.split(hashes, np.searchsorted(gid, np.arange(1, n_groups)))
+
+
+def _union_size(sets):
+    sets = [s for s in sets if len(s)]
+    if not sets:
+        return 0
+    return len(np.unique(np.concatenate(sets)))
+
+
+#----------------CLASSES--------------
+#-------------------------------------
+class ActivityStore:
+    """
+    Células diárias (`cells`: KEYS e orders), sketches por entidade
+    (`registers`: arrays n_células x 2**p alinhados com `cells`) e conjuntos
+    exatos (`sets`: listas alinhadas com `cells`, ou None fora do modo
+    exato). Não é alterado depois de criado: `merge` e `filter` devolvem
+    novos objetos.
+    """
+
+    def __init__(self, cells, registers, sets):
+        self.cells = cells.reset_index(drop=True)
+        self.registers = registers
+        self.sets = sets
+
+    @classmethod
+    def _grouped(cls, keys, orders, parts):
+        """
+        Agrupa as linhas de `keys` por KEYS, somando `orders`.
+
+        parts = {entidade: (origem, hashes, registradores)}: `hashes` (ou
+        None, fora do modo exato) vêm das linhas `origem` de `keys`;
+        `registradores` (ou None, para calcular a partir dos hashes) estão
+        alinhados com `keys`.
+        """
+        grouped = keys.groupby(KEYS, observed=True, dropna=False, sort=True)
+        gid = grouped.ngroup().to_numpy()
+        cells = grouped.size().index.to_frame(index=False)
+        cells['orders'] = np.bincount(gid, weights=orders, minlength=len(cells)).astype(np.int64)
+
+        registers, sets = {}, {}
+        for entity, (source, hashes, source_registers) in parts.items():
+            if source_registers is None:
+                registers[entity] = hll_registers(gid[source], hashes, len(cells), HLL_PRECISION)
+            else:
+                registers[entity] = np.zeros((len(cells), source_registers.shape[1]), dtype=np.uint8)
+                np.maximum.at(registers[entity], gid, source_registers)
+
+            sets[entity] = None
+            if hashes is not None and len(np.unique(hashes)) <= EXACT_MAX_DISTINCT:
+                sets[entity] = _split_sets(gid[source], hashes, len(cells))
+        return cls(cells, registers, sets)
+
+    @classmethod
+    def build(cls, df1):
+        parts = {}
+        for entity, (hashes, valid) in entity_hashes(df1).items():
+            rows = np.flatnonzero(valid)
+            parts[entity] = (rows, hashes[rows], None)
+        return cls._grouped(df1[KEYS], np.ones(len(df1)), parts)
+
+    def merge(self, new_orders):
+        """
+        Store com os pedidos de `new_orders` (já limpos) acrescentados: as
+        células antigas e as novas são reagrupadas, unindo sketches e
+        conjuntos exatos das células com as mesmas chaves.
+        """
+        delta = ActivityStore.build(new_orders)
+        keys = pd.concat([self.cells[KEYS], delta.cells[KEYS]], ignore_index=True)
+        for col in KEYS[1:]:
+            keys[col] = keys[col].astype('category')
+        orders = np.concatenate([self.cells['orders'], delta.cells['orders']])
+
+        parts = {}
+        for entity in self.registers.keys() & delta.registers.keys():
+            stacked = np.concatenate([self.registers[entity], delta.registers[entity]])
+            source, hashes = None, None
+            if self.is_exact(entity) and delta.is_exact(entity):
+                all_sets = list(self.sets[entity]) + list(delta.sets[entity])
+                source = np.repeat(np.arange(len(all_sets)), [len(s) for s in all_sets])
+                hashes = np.concatenate(all_sets)
+            parts[entity] = (source, hashes, stacked)
+        return ActivityStore._grouped(keys, orders, parts)
+
+    def filter(self, data_limite=None, cidades=None, transito=None):
+        """Mesmos filtros do sidebar (ver rollup.filter_rollup)."""
+        mask = np.ones(len(self.cells), dtype=bool)
+        if data_limite is not None:
+            mask &= (self.cells['Order_Date'] < data_limite).to_numpy()
+        if cidades:
+            mask &= self.cells['City'].isin(cidades).to_numpy()
+        if transito:
+            mask &= self.cells['Road_traffic_density'].isin(transito).to_numpy()
+        rows = np.flatnonzero(mask)
+        return ActivityStore(
+            self.cells.iloc[rows],
+            {entity: registers[rows] for entity, registers in self.registers.items()},
+            {entity: None if sets is None else [sets[i] for i in rows] for entity, sets in self.sets.items()},
+        )
+
+    def is_exact(self, entity='couriers'):
+        return self.sets.get(entity) is not None
+
+    def distinct(self, entity='couriers', rows=None):
+        """
+        Distintos de `entity` nas células `rows` (posições; None = todas):
+        exato no modo exato, senão a estimativa HLL arredondada.
+        """
+        if rows is None:
+            rows = np.arange(len(self.cells))
+        if self.is_exact(entity):
+            return _union_size([self.sets[entity][i] for i in rows])
+        if len(rows) == 0:
+            return 0
+        return int(round(hll_estimate(self.registers[entity][rows].max(axis=0))))
+
+    def _buckets(self, bucket, entity='couriers'):
+        """Pedidos e entregadores distintos por balde."""
+        grouped = self.cells.groupby(bucket, sort=True)
+        out = grouped['orders'].sum().to_frame()
+        out['couriers'] = [self.distinct(entity, rows) for rows in grouped.indices.values()]
+        out['order_by_delivery'] = out['orders'] / out['couriers'].where(out['couriers'] > 0)
+        return out
+
+    def daily(self):
+        """Pedidos, entregadores distintos e pedidos por entregador em cada dia."""
+        return self._buckets(self.cells['Order_Date'].rename('Order_Date')).reset_index()
+
+    def weekly(self):
+        """
+        O mesmo por semana ISO (iso_year, week_of_year), com o crescimento de
+        pedidos em relação à semana anterior (wow_growth, %).
+        """
+        iso = self.cells['Order_Date'].dt.isocalendar()
+        out = self._buckets([iso['year'].rename('iso_year'), iso['week'].rename('week_of_year')]).reset_index()
+        out['wow_growth'] = 100 * out['orders'].pct_change()
+        return out
+
+    def rolling(self, windows=ROLLING_WINDOWS, entity='couriers'):
+        """
+        Para cada dia, pedidos, entregadores distintos e pedidos por
+        entregador nos últimos N dias (N em `windows`, dias corridos).
+
+        No modo exato os distintos da janela são contados pelo último dia em
+        que cada entregador apareceu: ele está na janela [início, dia] se esse
+        último dia for >= início. Sem o modo exato, os sketches dos dias da
+        janela são unidos.
+        """
+        grouped = self.cells.groupby('Order_Date', sort=True)
+        days = grouped['orders'].sum()
+        day_rows = list(grouped.indices.values())
+        dates = days.index.to_numpy()
+        cum = np.concatenate([[0], days.to_numpy().cumsum()])
+        starts = {
+            n: np.searchsorted(dates, dates - np.timedelta64(n - 1, 'D'), side='left')
+            for n in windows
+        }
+
+        distinct = {n: np.zeros(len(dates), dtype=np.int64) for n in windows}
+        if self.is_exact(entity):
+            sets = self.sets[entity]
+            vocab = np.unique(np.concatenate(sets)) if sets else np.empty(0, dtype=np.uint64)
+            last_seen = np.full(len(vocab), -1, dtype=np.int64)
+            for day, rows in enumerate(day_rows):
+                for i in rows:
+                    last_seen[np.searchsorted(vocab, sets[i])] = day
+                for n in windows:
+                    distinct[n][day] = np.count_nonzero(last_seen >= starts[n][day])
+        else:
+            per_day = np.stack([self.registers[entity][rows].max(axis=0) for rows in day_rows]) if day_rows else None
+            for day in range(len(dates)):
+                for n in windows:
+                    distinct[n][day] = round(hll_estimate(per_day[starts[n][day]:day + 1].max(axis=0)))
+
+        out = pd.DataFrame({'Order_Date': days.index})
+        for n in windows:
+            orders = cum[1:] - cum[starts[n]]
+            couriers = distinct[n]
+            out[f'orders_{n}d'] = orders
+            out[f'couriers_{n}d'] = couriers
+            out[f'order_by_delivery_{n}d'] = orders / np.where(couriers > 0, couriers, np.nan)
+        return out
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def build_activity(df1):
+    return ActivityStore.build(df1)
+
+
+def merge_activity(store, new_orders):
+    return store.merge(new_orders)
+
+
+@timed('activity')
+def load_activity(path=DATA_PATH):
+    """
+    Store de atividade do dataset limpo, calculado uma vez por versão do CSV
+    e atualizado incrementalmente quando o CSV apenas recebe linhas novas.
+    """
+    return cached(
+        'activity',
+        lambda: build_activity(load_data(columns=KEYS + [COURIER] + RESTAURANT_COLUMNS, path=path)),
+        path,
+        update=merge_activity
+    )
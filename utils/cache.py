@@ -0,0 +1,134 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Limites padrão de cada cache de resultados (por página)
+MAX_ENTRIES = 64
+MAX_MB = 128
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def nbytes(value):
+    """Estimativa do tamanho em memória de um resultado (frames, arrays, dicts)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+#----------------CLASSES--------------
+#-------------------------------------
+class ResultCache:
+    """
+    Cache LRU de resultados calculados, limitado por número de entradas e
+    por memória (MB estimados com `nbytes`).
+
+    Guarda contadores de hits, misses e evictions. Os valores são
+    compartilhados entre quem os lê e não devem ser alterados no lugar.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_mb=MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = max_mb * 2**20
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # chave -> Lock do cálculo em andamento
+        self._inflight = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        # Chamado com self._lock adquirido
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key][0]
+        return False, None
+
+    def get_or_compute(self, key, compute):
+        """
+        Retorna o valor de `key`, calculando-o com `compute()` se necessário.
+        Se outra thread já está calculando `key` (ex.: o prefetch ou o
+        aquecimento), espera e usa o resultado dela.
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            pending = self._inflight.setdefault(key, threading.Lock())
+
+        try:
+            with pending:
+                with self._lock:
+                    found, value = self._lookup(key)
+                    if found:
+                        return value
+                    self.misses += 1
+
+                value = compute()
+                size = nbytes(value)
+
+                with self._lock:
+                    if key in self._entries:
+                        self.bytes -= self._entries.pop(key)[1]
+                    # Um resultado maior que o cache inteiro não é guardado
+                    if size <= self.max_bytes:
+                        self._entries[key] = (value, size)
+                        self.bytes += size
+                        self._evict()
+                return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is pending and not pending.locked():
+                    del self._inflight[key]
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Contadores e ocupação atual do cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'mb': round(self.bytes / 2**20, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 3) if total else None,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def result_cache(name):
+    """ResultCache compartilhado identificado por `name` (ex.: uma página)."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ResultCache()
+        return _caches[name]
@@ -0,0 +1,338 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.geo import delivery_distance
+from utils.profiling import timed
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Textos usados no CSV para representar valores ausentes (após o strip)
+NULL_STRINGS = ['NaN', 'nan', 'NULL', 'null', 'None', 'none', '']
+
+CATEGORY_COLUMNS = [
+    'Delivery_person_ID',
+    'City',
+    'Road_traffic_density',
+    'Weather_clean',
+    'Type_of_order',
+    'Type_of_vehicle',
+    'Festival',
+]
+FLOAT32_COLUMNS = [
+    'Delivery_person_Ratings',
+    'Restaurant_latitude',
+    'Restaurant_longitude',
+    'Delivery_location_latitude',
+    'Delivery_location_longitude',
+]
+INT8_COLUMNS = [
+    'Delivery_person_Age',
+    'Vehicle_condition',
+    'multiple_deliveries',
+]
+
+
+SECONDS_PER_DAY = 24 * 3600
+
+# Pares (latitude, longitude) validados na limpeza
+COORDINATE_PAIRS = [
+    ('Restaurant_latitude', 'Restaurant_longitude'),
+    ('Delivery_location_latitude', 'Delivery_location_longitude'),
+]
+# Região de operação (Índia): coordenadas fora dela são inválidas
+REGION_LAT = (6.0, 37.0)
+REGION_LON = (68.0, 98.0)
+# Corrige coordenadas com sinal invertido que caem na região (ex.: -22.7)
+REPAIR_SIGN_FLIPS = True
+
+# Situação das coordenadas de cada pedido, da melhor para a pior. A pior
+# situação entre os pares define a linha; só 'ok' e 'sign_repaired' são usadas
+# em distâncias e mapas.
+COORD_STATUS = ['ok', 'sign_repaired', 'sign_flipped', 'missing', 'out_of_region', 'zero']
+VALID_COORD_STATUS = ['ok', 'sign_repaired']
+
+# Colunas category com ordem fixa de categorias (as demais ficam ordenadas)
+FIXED_CATEGORIES = {'coord_status': COORD_STATUS}
+
+# Limpeza paralela: abaixo deste número de linhas o custo dos processos não compensa
+PARALLEL_MIN_ROWS = 200_000
+# Blocos por processo (blocos menores equilibram melhor a carga)
+CHUNKS_PER_WORKER = 2
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def parse_hms(s):
+    """
+    Converte horários no formato fixo 'HH:MM:SS' em segundos desde a
+    meia-noite (Int32, nulo quando ausente ou inválido).
+
+    Os textos são vistos como uma matriz de bytes de 8 colunas e os dígitos
+    são convertidos de uma vez com numpy, sem inferência de formato por
+    elemento. Os poucos valores fora do formato fixo (ex.: '9:05:00') passam
+    por `pd.to_timedelta`.
+    """
+    values = s.astype('string').reset_index(drop=True)
+    n = len(values)
+    out = np.zeros(n, dtype=np.int32)
+    valid = (values.str.len() == 8).fillna(False).to_numpy(dtype=bool)
+
+    try:
+        raw = np.array(values.fillna('').to_numpy(dtype=object), dtype='S8')
+    except UnicodeEncodeError:
+        valid[:] = False
+    else:
+        b = raw.view(np.uint8).reshape(n, 8).astype(np.int32)
+        digits = b[:, [0, 1, 3, 4, 6, 7]] - ord('0')
+        hh = digits[:, 0] * 10 + digits[:, 1]
+        mm = digits[:, 2] * 10 + digits[:, 3]
+        ss = digits[:, 4] * 10 + digits[:, 5]
+        valid &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+        valid &= (b[:, 2] == ord(':')) & (b[:, 5] == ord(':'))
+        valid &= (hh < 24) & (mm < 60) & (ss < 60)
+        out = np.where(valid, hh * 3600 + mm * 60 + ss, 0).astype(np.int32)
+
+    result = pd.array(out, dtype='Int32')
+    result[~valid] = pd.NA
+
+    # Caminho lento só para os valores não nulos fora do formato fixo
+    leftover = ~valid & values.notna().to_numpy(dtype=bool)
+    if leftover.any():
+        delta = pd.to_timedelta(values[leftover], errors='coerce').dt.total_seconds()
+        delta = np.floor(delta.where((delta >= 0) & (delta < SECONDS_PER_DAY)))
+        result[leftover] = delta.astype('Int32').to_numpy()
+
+    return pd.Series(result, index=s.index, name=s.name)
+
+
+def prep_time(ordered, picked):
+    """
+    Tempo de preparo (coleta - pedido) em minutos, a partir dos horários em
+    segundos desde a meia-noite.
+
+    Quando a coleta ocorre depois da meia-noite (horário menor que o do
+    pedido) soma-se um dia. Retorna (prep_time em float32, virou_o_dia).
+    """
+    delay = picked - ordered
+    next_day = delay < 0
+    delay = delay.where(~next_day.fillna(False), delay + SECONDS_PER_DAY)
+    return (delay / 60).astype(np.float32), next_day.astype('boolean')
+
+
+def _in_region(lat, lon):
+    return (
+        (lat >= REGION_LAT[0]) & (lat <= REGION_LAT[1])
+        & (lon >= REGION_LON[0]) & (lon <= REGION_LON[1])
+    )
+
+
+def validate_coordinates(df1, repair_sign=REPAIR_SIGN_FLIPS):
+    """
+    Classifica as coordenadas de cada linha conforme COORD_STATUS, de forma
+    vetorizada, e retorna a Series categórica `coord_status`.
+
+    - zero: latitude ou longitude igual a 0
+    - sign_flipped: fora da região, mas dentro dela com o sinal invertido;
+      com `repair_sign` as colunas de `df1` são corrigidas (valor absoluto)
+      e a linha fica como sign_repaired
+    - out_of_region: fora de REGION_LAT/REGION_LON
+    - missing: coordenada ausente
+    """
+    status = np.zeros(len(df1), dtype=np.int8)
+    for lat_col, lon_col in COORDINATE_PAIRS:
+        lat = df1[lat_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        lon = df1[lon_col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        flipped = ~_in_region(lat, lon) & _in_region(np.abs(lat), np.abs(lon))
+        if repair_sign and flipped.any():
+            df1.loc[flipped, lat_col] = np.abs(lat[flipped]).astype(np.float32)
+            df1.loc[flipped, lon_col] = np.abs(lon[flipped]).astype(np.float32)
+
+        pair = np.select(
+            [
+                np.isnan(lat) | np.isnan(lon),
+                (lat == 0) | (lon == 0),
+                flipped,
+                ~_in_region(lat, lon),
+            ],
+            [
+                COORD_STATUS.index('missing'),
+                COORD_STATUS.index('zero'),
+                COORD_STATUS.index('sign_repaired' if repair_sign else 'sign_flipped'),
+                COORD_STATUS.index('out_of_region'),
+            ],
+            default=COORD_STATUS.index('ok'),
+        )
+        np.maximum(status, pair, out=status)
+
+    return pd.Series(pd.Categorical.from_codes(status, categories=COORD_STATUS), index=df1.index)
+
+
+def coordinate_report(df1):
+    """Quantidade de linhas em cada situação de `coord_status` (inclusive zeradas)."""
+    return df1['coord_status'].value_counts().reindex(COORD_STATUS, fill_value=0)
+
+
+def valid_coordinates(df1):
+    """Linhas de `df1` com coordenadas válidas (usadas em distâncias e mapas)."""
+    if 'coord_status' not in df1:
+        return df1
+    return df1.loc[df1['coord_status'].isin(VALID_COORD_STATUS).to_numpy()]
+
+
+@timed('clean')
+def clean_code(df1, repair_sign=REPAIR_SIGN_FLIPS):
+    """
+    Esta função é usada para limpar o dataframe lido de `train.csv`.
+
+    Tipos de limpeza:
+    1 - Remove espaços das colunas de texto e troca 'NaN ', 'NULL', '' etc. por nulo
+    2 - Transforma a coluna de data em tipo data e descarta datas inválidas
+    3 - Cria uma coluna de semana do ano
+    4 - Transforma idade, rating, condição do veículo e entregas múltiplas em número
+    5 - Padroniza City, Festival, Road_traffic_density e cria Weather_clean
+    6 - Transforma a coluna time_taken em número
+    7 - Transforma Time_Orderd e Time_Order_picked em segundos desde a
+        meia-noite e cria prep_time (min) e picked_next_day
+    8 - Valida as coordenadas (coord_status, ver `validate_coordinates`) e
+        cria a coluna de distância (Km), nula para coordenadas inválidas
+    9 - Ordena as linhas por data do pedido (usado pelos filtros de data)
+
+    Todas as páginas usam esta mesma limpeza. Linhas sem idade do
+    entregador são mantidas (idade nula), pois continuam sendo pedidos.
+
+    Os tipos gerados são compactos: category para textos com poucos valores,
+    Int8/int8 para inteiros pequenos e float32 para medidas. O frame recebido
+    é modificado; passe uma cópia se precisar preservá-lo.
+    """
+    # 1 - Colunas de texto
+    for col in df1.select_dtypes(include=['object', 'string']).columns:
+        df1[col] = df1[col].astype('string').str.strip().replace(NULL_STRINGS, pd.NA)
+
+    # 2 - Data do pedido (datas inválidas viram NaT e são descartadas)
+    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y', errors='coerce')
+    df1 = df1.dropna(subset=['Order_Date']).reset_index(drop=True)
+
+    # 3 - Semana do ano
+    df1['week_of_year'] = df1['Order_Date'].dt.isocalendar().week.astype(np.int8)
+
+    # 4 - Colunas numéricas
+    for col in INT8_COLUMNS:
+        df1[col] = pd.to_numeric(df1[col], errors='coerce').astype('Int8')
+
+    for col in FLOAT32_COLUMNS:
+        df1[col] = pd.to_numeric(df1[col], errors='coerce').astype(np.float32)
+
+    # 5 - Categorias
+    df1['Festival'] = df1['Festival'].str.capitalize()
+    df1['Road_traffic_density'] = df1['Road_traffic_density'].str.capitalize()
+    df1['Weather_clean'] = (
+        df1['Weatherconditions']
+           .str.replace(r'^conditions\s+', '', regex=True)
+           .replace(NULL_STRINGS, pd.NA)
+    )
+    df1 = df1.drop(columns=['Weatherconditions'])
+
+    for col in CATEGORY_COLUMNS:
+        df1[col] = df1[col].astype('category')
+
+    # 6 - Tempo de entrega: '(min) 24' -> 24
+    df1['Time_taken(min)'] = (
+        df1['Time_taken(min)']
+           .astype('string')
+           .str.extract(r'(\d+)', expand=False)
+           .astype(np.float32)
+    )
+
+    # 7 - Horários do pedido e da coleta (segundos desde a meia-noite)
+    for col in ['Time_Orderd', 'Time_Order_picked']:
+        df1[col] = parse_hms(df1[col])
+    df1['prep_time'], df1['picked_next_day'] = prep_time(df1['Time_Orderd'], df1['Time_Order_picked'])
+
+    # 8 - Coordenadas e distância restaurante -> entrega (Km), só para as válidas
+    df1['coord_status'] = validate_coordinates(df1, repair_sign)
+    valid = df1['coord_status'].isin(VALID_COORD_STATUS).to_numpy()
+    df1['distancia_km'] = np.float32(np.nan)
+    df1.loc[valid, 'distancia_km'] = delivery_distance(df1.loc[valid]).astype(np.float32)
+
+    # 9 - Ordenação por data
+    df1 = df1.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+    return df1
+
+
+def concat_clean(frames):
+    """
+    Concatena frames limpos separadamente (blocos da ingestão ou da limpeza
+    paralela) mantendo as colunas category: as categorias de cada coluna são
+    unidas e ordenadas, como a limpeza do frame inteiro geraria. Um
+    `pd.concat` simples transformaria em object as colunas cujas categorias
+    diferem entre os blocos. As colunas de FIXED_CATEGORIES mantêm sua ordem.
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+
+    categoricals = {}
+    for col in frames[0].select_dtypes(include='category').columns:
+        values = union_categoricals([f[col] for f in frames], sort_categories=True, ignore_order=True)
+        if col in FIXED_CATEGORIES:
+            values = values.set_categories(FIXED_CATEGORIES[col])
+        categoricals[col] = values
+    df1 = pd.concat(
+        [f.drop(columns=list(categoricals)) for f in frames],
+        ignore_index=True
+    )
+    for col, values in categoricals.items():
+        df1[col] = values
+    return df1[frames[0].columns]
+
+
+def clean_chunks(chunks, workers=1, repair_sign=REPAIR_SIGN_FLIPS):
+    """
+    Limpa com `clean_code` os blocos de `chunks` (qualquer iterável de
+    frames) e os devolve na mesma ordem, em um pool de `workers` processos
+    quando workers > 1. No máximo `workers` blocos ficam em andamento, então
+    um leitor em blocos (ex.: a ingestão do CSV) nunca é lido inteiro antes
+    de o primeiro bloco limpo ser consumido.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield clean_code(chunk, repair_sign)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(clean_code, chunk, repair_sign))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def clean_parallel(df1, workers=None, repair_sign=REPAIR_SIGN_FLIPS):
+    """
+    Mesma limpeza de `clean_code`, com o frame dividido em blocos de linhas
+    limpos em paralelo com `clean_chunks` (opcional, para exportações com
+    milhões de linhas).
+
+    workers: número de processos (None = número de CPUs). Com 1 processo ou
+        menos de PARALLEL_MIN_ROWS linhas a limpeza é feita aqui mesmo.
+
+    Os blocos são unidos com `concat_clean` e reordenados por data de forma
+    estável, então o resultado é igual ao de `clean_code(df1)`.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(df1) < PARALLEL_MIN_ROWS:
+        return clean_code(df1, repair_sign)
+
+    bounds = np.linspace(0, len(df1), workers * CHUNKS_PER_WORKER + 1).astype(int)
+    chunks = (df1.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:]))
+    df1 = concat_clean(list(clean_chunks(chunks, workers, repair_sign)))
+    return df1.sort_values('Order_Date', kind='stable').reset_index(drop=True)
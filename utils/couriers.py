@@ -0,0 +1,164 @@
+"""
+Perfis dos entregadores: uma linha por Delivery_person_ID com quantidade de
+pedidos, média e desvio padrão do tempo de entrega, avaliação média, idade e
+condição do veículo (do pedido mais recente), cidade principal e datas do
+primeiro e do último pedido.
+
+O store guarda os momentos (n, média, M2) do tempo e da avaliação e os
+pedidos por cidade, como o cubo de utils.rollup, então linhas novas no CSV
+são agregadas e combinadas aos perfis existentes sem reprocessar os pedidos
+antigos. A tabela exibida (`courier_table`) usa tipos compactos e é servida
+paginada (`page_profiles`), sem enviar todos os entregadores ao navegador.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_PATH, cached, load_data
+from utils.profiling import timed
+from utils.rollup import combine
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+COURIER = 'Delivery_person_ID'
+
+# Medidas agregadas por entregador: nome curto -> coluna do dataset limpo
+MEASURES = {
+    'time': 'Time_taken(min)',
+    'rating': 'Delivery_person_Ratings',
+}
+
+# Atributos do entregador tomados do pedido mais recente
+LATEST = ['Delivery_person_Age', 'Vehicle_condition']
+
+PROFILE_COLUMNS = [COURIER, 'Order_Date', 'City'] + list(MEASURES.values()) + LATEST
+
+# Prefixo das colunas de pedidos por cidade no store
+CITY_PREFIX = 'orders:'
+
+# Linhas por página da tabela de perfis
+PAGE_SIZE = 25
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def build_profiles(df1):
+    """Store de perfis (índice Delivery_person_ID, ordenado) de `df1`."""
+    df1 = df1[df1[COURIER].notna()]
+    # Momentos em float64, como em rollup.build_rollup
+    df1 = df1.assign(**{col: df1[col].astype(np.float64) for col in MEASURES.values()})
+    grouped = df1.groupby(COURIER, observed=True, sort=True)
+    aggs = {
+        'orders': ('Order_Date', 'size'),
+        'first_order': ('Order_Date', 'min'),
+        'last_order': ('Order_Date', 'max'),
+    }
+    for name, col in MEASURES.items():
+        aggs[f'{name}_n'] = (col, 'count')
+        aggs[f'{name}_mean'] = (col, 'mean')
+        aggs[f'{name}_var'] = (col, 'var')
+    profiles = grouped.agg(**aggs)
+
+    for name in MEASURES:
+        n = profiles[f'{name}_n']
+        profiles[f'{name}_mean'] = profiles[f'{name}_mean'].astype(np.float64).fillna(0)
+        profiles[f'{name}_m2'] = (profiles.pop(f'{name}_var').astype(np.float64) * (n - 1)).fillna(0)
+
+    # Último valor conhecido de cada atributo e a data do pedido de onde veio
+    # (<col>_at), para que o merge escolha o mesmo valor que um rebuild.
+    # Ordenação estável: empates de data ficam com o último pedido do arquivo
+    ordered = df1.sort_values('Order_Date', kind='stable')
+    for col in LATEST:
+        known = ordered.loc[ordered[col].notna(), [COURIER, col, 'Order_Date']]
+        latest = known.groupby(COURIER, observed=True, sort=True).last()
+        profiles = profiles.join(latest.rename(columns={'Order_Date': f'{col}_at'}))
+    cities = df1.groupby([COURIER, 'City'], observed=True).size().unstack(fill_value=0).add_prefix(CITY_PREFIX)
+    # Entregadores sem nenhum pedido com cidade ficam fora do unstack
+    profiles = profiles.join(cities)
+    profiles[cities.columns] = profiles[cities.columns].fillna(0).astype(np.int64)
+    profiles.index = profiles.index.astype(str)
+    return profiles
+
+
+def merge_profiles(profiles, new_orders):
+    """
+    Perfis com os pedidos de `new_orders` (já limpos) acrescentados: os
+    momentos são combinados (rollup.combine), os pedidos por cidade somados
+    e idade/condição do veículo vêm do perfil em que foram vistas por último.
+    """
+    delta = build_profiles(new_orders)
+    parts = pd.concat([profiles, delta]).rename_axis(COURIER)
+    grouped = parts.groupby(level=COURIER, sort=True)
+
+    merged = combine(parts.reset_index(), [COURIER], MEASURES).set_index(COURIER)
+    merged['first_order'] = grouped['first_order'].min()
+    merged['last_order'] = grouped['last_order'].max()
+    for col in LATEST:
+        columns = [col, f'{col}_at']
+        merged = merged.join(parts.sort_values(f'{col}_at', kind='stable').groupby(level=COURIER)[columns].last())
+    city_columns = [col for col in parts if col.startswith(CITY_PREFIX)]
+    merged = merged.join(grouped[city_columns].sum().astype(np.int64))
+    return merged.loc[:, profiles.columns.union(merged.columns, sort=False)]
+
+
+@timed('profiles')
+def load_profiles(path=DATA_PATH):
+    """
+    Perfis do dataset limpo, calculados uma vez por versão do CSV e
+    atualizados incrementalmente quando o CSV apenas recebe linhas novas.
+    """
+    return cached(
+        'profiles',
+        lambda: build_profiles(load_data(columns=PROFILE_COLUMNS, path=path)),
+        path,
+        update=merge_profiles
+    )
+
+
+def courier_table(profiles):
+    """
+    Tabela exibida dos perfis, com tipos compactos (inteiros pequenos,
+    float32 e cidade categórica), indexada por Delivery_person_ID.
+    """
+    cities = profiles.loc[:, [col for col in profiles if col.startswith(CITY_PREFIX)]]
+    # Sem pedidos com cidade conhecida, a cidade principal fica nula
+    if cities.shape[1]:
+        main_city = cities.idxmax(axis=1).str.removeprefix(CITY_PREFIX).where(cities.sum(axis=1) > 0)
+    else:
+        main_city = np.nan
+
+    table = pd.DataFrame(index=profiles.index)
+    table['orders'] = profiles['orders'].astype(np.int32)
+    n = profiles['time_n']
+    table['time_mean'] = profiles['time_mean'].where(n > 0).astype(np.float32).round(2)
+    table['time_std'] = np.sqrt(profiles['time_m2'] / (n - 1).where(n > 1)).astype(np.float32).round(2)
+    table['rating_mean'] = profiles['rating_mean'].where(profiles['rating_n'] > 0).astype(np.float32).round(2)
+    for col in LATEST:
+        table[col] = profiles[col].astype('Int8')
+    table['main_city'] = pd.Series(main_city, index=profiles.index).astype('category')
+    table['first_order'] = profiles['first_order']
+    table['last_order'] = profiles['last_order']
+    return table
+
+
+@timed('courier_table')
+def load_courier_table(path=DATA_PATH):
+    return cached('courier_table', lambda: courier_table(load_profiles(path)), path)
+
+
+def search_profiles(table, termo=''):
+    """Posições das linhas de `table` cujo ID contém `termo` (sem diferenciar maiúsculas)."""
+    termo = termo.strip()
+    if not termo:
+        return np.arange(len(table))
+    return np.flatnonzero(table.index.str.contains(termo, case=False, regex=False))
+
+
+def page_profiles(table, rows, pagina=1, por_pagina=PAGE_SIZE):
+    """
+    Página `pagina` (a partir de 1) das linhas `rows` de `table`, com no
+    máximo `por_pagina` entregadores. Retorna (página, total de páginas).
+    """
+    paginas = max(1, -(-len(rows) // por_pagina))
+    pagina = min(max(1, pagina), paginas)
+    start = (pagina - 1) * por_pagina
+    return table.iloc[rows[start:start + por_pagina]], paginas
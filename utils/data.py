@@ -0,0 +1,523 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.cleaning import FIXED_CATEGORIES, clean_chunks, clean_code, concat_clean, coordinate_report
+from utils.profiling import timed, timer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow o cache em disco é simplesmente desativado
+    pa = pq = None
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+DATA_PATH = "dataset/train.csv"
+CACHE_DIR = "dataset/cache"
+
+# Incrementar quando a limpeza mudar, para invalidar os caches em disco
+CACHE_VERSION = "7"
+
+# Teto de memória padrão (MB) para cada bloco lido e limpo na ingestão
+MEMORY_LIMIT_MB = 256
+# Linhas usadas para estimar o tamanho de uma linha na memória
+SAMPLE_ROWS = 1000
+# Quanto a limpeza multiplica o tamanho do bloco bruto (cópias temporárias)
+CLEANING_OVERHEAD = 4
+
+# Bytes finais já ingeridos cujo hash confirma que o CSV só recebeu linhas novas
+TAIL_HASH_BYTES = 4096
+
+# Processos usados para limpar os blocos da ingestão (1 = sem paralelismo).
+# Com N processos cada bloco recebe 1/N do teto de memória.
+WORKERS = 1
+
+# Cache em memória do processo: o Streamlit reexecuta o script da página a
+# cada interação, mas os módulos importados (como este) permanecem vivos,
+# então todas as páginas compartilham o mesmo cache.
+_lock = threading.RLock()
+_clean_cache = {}
+_derived_cache = {}
+# caminho -> mtime do CSV com o qual o cache em disco já foi sincronizado
+_synced = {}
+# caminho -> (mtime anterior, mtime novo, linhas novas já limpas)
+_last_delta = {}
+# chave de cache -> Lock do cálculo em andamento (ver _single_flight)
+_inflight = {}
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def _file_key(path):
+    """Retorna a chave (caminho absoluto, mtime) usada para invalidar o cache."""
+    path = os.path.abspath(path)
+    return path, os.stat(path).st_mtime_ns
+
+
+def data_version(path=DATA_PATH):
+    """Identifica a versão atual do CSV (caminho absoluto, mtime) para chaves de cache."""
+    return _file_key(path)
+
+
+def _evict_stale(cache, path, mtime):
+    # Remove entradas de versões antigas do mesmo arquivo
+    for key in [k for k in cache if k[0] == path and k[1] != mtime]:
+        del cache[key]
+
+
+@contextmanager
+def _single_flight(key):
+    """
+    Um único cálculo por chave de cache: quem chega enquanto outra thread
+    (ex.: o aquecimento) calcula a mesma chave espera por ela e, ao entrar,
+    deve consultar o cache de novo antes de calcular.
+    """
+    with _lock:
+        pending = _inflight.setdefault(key, threading.Lock())
+    try:
+        with pending:
+            yield
+    finally:
+        with _lock:
+            if _inflight.get(key) is pending and not pending.locked():
+                del _inflight[key]
+
+
+def cache_path(path=DATA_PATH):
+    """Diretório do cache Parquet correspondente ao CSV `path`."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, name)
+
+
+def _state_path(path):
+    return os.path.join(cache_path(path), '_state.json')
+
+
+def read_state(path=DATA_PATH):
+    """
+    Estado do cache em disco: versão, mtime e tamanho (offset) do CSV já
+    ingerido, cabeçalho, hash dos últimos bytes ingeridos e partes gravadas.
+    Retorna None se não houver cache válido.
+    """
+    try:
+        with open(_state_path(path)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('cache_version') != CACHE_VERSION:
+        return None
+    return state
+
+
+def _write_state(path, state):
+    tmp = os.path.join(cache_path(path), '._state.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, _state_path(path))
+
+
+def _tail_hash(path, offset):
+    with open(path, 'rb') as f:
+        f.seek(max(offset - TAIL_HASH_BYTES, 0))
+        return hashlib.sha1(f.read(offset - f.tell())).hexdigest()
+
+
+def _write_part(df1, path, number):
+    """
+    Grava `df1` como a parte `number` do cache, particionada por mês do
+    pedido (month=AAAA-MM/part-NNNNN.parquet).
+    """
+    # Arquivos iniciados por '.' ou '_' são ignorados na leitura do diretório,
+    # então leitores nunca veem uma parte pela metade
+    months = df1['Order_Date'].dt.strftime('%Y-%m')
+    for month, part in df1.groupby(months, sort=True):
+        target = os.path.join(cache_path(path), f'month={month}')
+        os.makedirs(target, exist_ok=True)
+        tmp = os.path.join(target, f'.part-{number:05d}.tmp')
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp)
+        os.replace(tmp, os.path.join(target, f'part-{number:05d}.parquet'))
+
+
+class _BoundedReader(io.RawIOBase):
+    """Leitor que entrega apenas os próximos `remaining` bytes de `f`."""
+
+    def __init__(self, f, remaining):
+        self.f = f
+        self.remaining = remaining
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.f.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def _ends_line(path, offset):
+    # Se o que foi ingerido até `offset` termina em uma quebra de linha
+    if offset == 0:
+        return True
+    with open(path, 'rb') as f:
+        f.seek(offset - 1)
+        return f.read(1) == b'\n'
+
+
+def chunk_rows_for(path, memory_limit_mb=MEMORY_LIMIT_MB):
+    """
+    Número de linhas por bloco para que a leitura + limpeza de um bloco
+    caiba em `memory_limit_mb`, estimado a partir de uma amostra do CSV.
+    """
+    sample = pd.read_csv(path, nrows=SAMPLE_ROWS, dtype=str)
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    rows = int(memory_limit_mb * 2**20 / (bytes_per_row * CLEANING_OVERHEAD))
+    return max(rows, SAMPLE_ROWS)
+
+
+def _stream_ingest(path, offset, end, header, first_part, chunk_rows, keep_rows, workers=WORKERS):
+    """
+    Lê os bytes [offset, end) do CSV em blocos de `chunk_rows` linhas,
+    limpa cada bloco com `clean_code` (em `workers` processos) e grava cada
+    um como nova parte.
+
+    Retorna (partes gravadas, linhas lidas, linhas limpas). As linhas
+    limpas só são devolvidas se couberem em `keep_rows`; caso contrário
+    retorna None no lugar delas.
+    """
+    names = header.strip().split(',')
+    parts, total, kept = 0, 0, []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        if offset == 0:
+            f.readline()
+        source = io.BufferedReader(_BoundedReader(f, end - f.tell()))
+        reader = pd.read_csv(source, names=names, header=None, dtype=str, chunksize=chunk_rows)
+        for chunk in clean_chunks(reader, workers):
+            total += len(chunk)
+            if not len(chunk):
+                continue
+            _write_part(chunk, path, first_part + parts)
+            parts += 1
+            if kept is not None:
+                kept = kept + [chunk] if total <= keep_rows else None
+
+    if kept is None:
+        return parts, total, None
+    if not kept:
+        return parts, total, clean_code(pd.DataFrame(columns=names, dtype=str))
+    return parts, total, concat_clean(kept)
+
+
+def read_cache(path=DATA_PATH, columns=None):
+    """
+    Lê o cache Parquet (todas as partes) se ele corresponder à versão atual
+    do CSV. Apenas `columns` são lidas (todas se None) e os arquivos são
+    mapeados em memória. Retorna None se o cache não existir ou estiver
+    desatualizado.
+
+    Cada parte está ordenada por Order_Date, mas um mês com várias partes
+    (ingestões grandes ou incrementais) volta fora de ordem; as linhas são
+    reordenadas aqui, uma única vez, para que os filtros de data (FilterIndex)
+    usem o frame sem copiá-lo.
+    """
+    if pq is None:
+        return None
+
+    _, source_mtime = _file_key(path)
+    state = read_state(path)
+    if state is None or state['source_mtime_ns'] != source_mtime:
+        return None
+
+    df1 = pd.read_parquet(cache_path(path), columns=columns, memory_map=True, partitioning=None)
+    if 'Order_Date' in df1 and not df1['Order_Date'].is_monotonic_increasing:
+        # Ordenação estável: dentro de uma data mantém a ordem do CSV
+        df1 = df1.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+    return sort_categories(df1)
+
+
+def sort_categories(df1):
+    """
+    Ordena as categorias das colunas category.
+
+    Partes limpas separadamente têm categorias diferentes e a leitura conjunta
+    as une na ordem em que aparecem; ordenar mantém o mesmo dtype que a
+    limpeza do CSV inteiro geraria. As colunas de FIXED_CATEGORIES voltam
+    para a sua ordem fixa.
+    """
+    for col in df1.select_dtypes(include='category').columns:
+        if col in FIXED_CATEGORIES:
+            df1[col] = df1[col].cat.set_categories(FIXED_CATEGORIES[col])
+            continue
+        categories = df1[col].cat.categories
+        if not categories.is_monotonic_increasing:
+            df1[col] = df1[col].cat.reorder_categories(categories.sort_values())
+    return df1
+
+
+def ingest(path=DATA_PATH, memory_limit_mb=MEMORY_LIMIT_MB, workers=WORKERS):
+    """
+    Reconstrói o cache Parquet do zero lendo o CSV em blocos.
+
+    Cada bloco (dimensionado para caber em `memory_limit_mb`) é limpo com
+    `clean_code` e gravado particionado por mês, então o CSV nunca precisa
+    caber inteiro na memória. Com `workers` > 1 os blocos são limpos em
+    paralelo, cada um com 1/workers do teto de memória.
+
+    Retorna o número de linhas limpas gravadas.
+    """
+    _, source_mtime = _file_key(path)
+    end = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline().decode()
+
+    target = cache_path(path)
+    shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(target)
+
+    chunk_rows = chunk_rows_for(path, memory_limit_mb / workers)
+    parts, total, _ = _stream_ingest(path, 0, end, header, 0, chunk_rows, keep_rows=0, workers=workers)
+    _write_state(path, {
+        'cache_version': CACHE_VERSION,
+        'source_mtime_ns': source_mtime,
+        'offset': end,
+        'header': header,
+        'tail_hash': _tail_hash(path, end),
+        'parts': parts,
+    })
+    return total
+
+
+def ingest_incremental(path=DATA_PATH, memory_limit_mb=MEMORY_LIMIT_MB, workers=WORKERS):
+    """
+    Ingere apenas as linhas acrescentadas ao CSV desde a última ingestão.
+
+    O CSV é considerado "só com linhas novas" quando o cabeçalho e os últimos
+    bytes já ingeridos não mudaram e o arquivo cresceu. Nesse caso somente
+    os bytes após o último offset são lidos (em blocos) e limpos, e o
+    resultado é gravado como novas partes do cache. Caso contrário é feita
+    a ingestão completa.
+
+    A última linha é ingerida mesmo sem quebra de linha no fim do arquivo.
+    Se ela ainda estava sendo escrita, o arquivo cresce a partir do meio de
+    uma linha e a próxima ingestão é completa.
+
+    Retorna as linhas novas já limpas, ou None se foi feita a ingestão
+    completa ou se as linhas novas não cabem em um bloco (nesses casos os
+    agregados devem ser recalculados).
+    """
+    _, source_mtime = _file_key(path)
+    state = read_state(path)
+    end = os.path.getsize(path)
+
+    appended = (
+        state is not None
+        and end >= state['offset']
+        and (end == state['offset'] or _ends_line(path, state['offset']))
+        and _tail_hash(path, state['offset']) == state['tail_hash']
+    )
+    if appended:
+        with open(path, 'rb') as f:
+            appended = f.readline().decode() == state['header']
+
+    if not appended:
+        ingest(path, memory_limit_mb, workers)
+        return None
+
+    chunk_rows = chunk_rows_for(path, memory_limit_mb / workers)
+    parts, _, delta = _stream_ingest(
+        path, state['offset'], end, state['header'], state['parts'], chunk_rows,
+        keep_rows=chunk_rows, workers=workers
+    )
+    state.update({
+        'source_mtime_ns': source_mtime,
+        'offset': end,
+        'tail_hash': _tail_hash(path, end),
+        'parts': state['parts'] + parts,
+    })
+    _write_state(path, state)
+    return delta
+
+
+def refresh(path=DATA_PATH):
+    """
+    Sincroniza o cache em disco com a versão atual do CSV (ingestão
+    incremental quando possível) e guarda as linhas novas para que os
+    agregados em memória sejam atualizados sem recalcular tudo.
+    """
+    if pq is None:
+        return
+
+    path, source_mtime = _file_key(path)
+    with _lock:
+        if _synced.get(path) == source_mtime:
+            return
+
+        with timer('ingest'):
+            state = read_state(path)
+            if state is None or state['source_mtime_ns'] != source_mtime:
+                delta = ingest_incremental(path)
+                if delta is not None and state is not None:
+                    _last_delta[path] = (state['source_mtime_ns'], source_mtime, delta)
+            _synced[path] = source_mtime
+
+
+def _read_columns(path, df, columns):
+    """
+    Frame `df` (ou None) estendido com as colunas de `columns` (None = todas)
+    que ele ainda não tem, lidas do cache Parquet. As colunas já carregadas
+    não são lidas de novo nem copiadas. Retorna (frame, tem todas as colunas).
+    """
+    names = pq.ParquetDataset(cache_path(path), partitioning=None).schema.names if pq is not None else None
+    wanted = names if columns is None else columns
+    missing = [col for col in wanted or [] if df is None or col not in df]
+
+    # Order_Date é lida sempre: read_cache ordena por ela de forma estável, então
+    # todas as leituras saem com as linhas na mesma ordem e podem ser juntadas
+    extra = read_cache(path, list(dict.fromkeys(['Order_Date'] + missing))) if names is not None else None
+    if extra is None:
+        return clean_code(pd.read_csv(path)), True
+
+    if df is None:
+        df = extra
+    else:
+        df = pd.concat([df, extra[missing]], axis=1)
+    complete = all(col in df for col in names)
+    return (df[names] if complete else df), complete
+
+
+@timed('load')
+def load_data(columns=None, path=DATA_PATH):
+    """
+    Carrega o dataset limpo, memorizando o resultado.
+
+    Ordem de busca:
+    1 - cache em memória: um único frame por versão do CSV (caminho, mtime)
+        com a união das colunas já pedidas; `columns` é uma seleção dele
+    2 - cache Parquet em disco (lendo somente as colunas que faltam no
+        frame em memória), atualizado antes pela ingestão incremental se o
+        CSV recebeu linhas novas
+    3 - sem pyarrow: leitura e limpeza do CSV inteiro com `clean_code`
+
+    Assim cada coluna fica uma única vez na memória, por mais conjuntos de
+    colunas que as páginas e estruturas derivadas peçam. As entradas são
+    descartadas automaticamente quando o CSV muda em disco. Chamadas
+    simultâneas (ex.: página e aquecimento) fazem a leitura uma única vez.
+
+    O dataframe retornado é compartilhado entre reruns e não deve ser
+    alterado no lugar — os filtros das páginas sempre geram novos frames.
+    """
+    columns = list(columns) if columns is not None else None
+    key = _file_key(path)
+
+    def lookup():
+        with _lock:
+            entry = _clean_cache.get(key)
+        if entry is None:
+            return None
+        df, complete = entry
+        if columns is None:
+            return df if complete else None
+        if all(col in df for col in columns):
+            return df[columns]
+        return None
+
+    df = lookup()
+    if df is not None:
+        return df
+
+    with _single_flight(key):
+        df = lookup()
+        if df is not None:
+            return df
+
+        refresh(path)
+        with _lock:
+            entry = _clean_cache.get(key)
+        df, complete = _read_columns(path, entry[0] if entry else None, columns)
+
+        with _lock:
+            _evict_stale(_clean_cache, key[0], key[1])
+            _clean_cache[key] = (df, complete)
+    return df if columns is None else df[columns]
+
+
+def cached(name, builder, path=DATA_PATH, update=None):
+    """
+    Memoriza `builder()` com a chave (caminho, mtime do CSV, name).
+
+    Usado pelas estruturas derivadas do dataset limpo (rollups, índices,
+    perfis), que assim são recalculadas apenas quando o CSV muda.
+
+    Se outra thread já está calculando a mesma chave, espera o resultado
+    dela em vez de calcular de novo.
+
+    Se `update(valor_antigo, linhas_novas)` for informado e o CSV apenas
+    recebeu linhas novas desde o valor em memória, o valor é atualizado com
+    as linhas novas já limpas em vez de recalculado do zero.
+    """
+    refresh(path)
+    key = _file_key(path) + (name,)
+    with _lock:
+        if key in _derived_cache:
+            return _derived_cache[key]
+
+    with _single_flight(key):
+        with _lock:
+            if key in _derived_cache:
+                return _derived_cache[key]
+            old = None
+            delta = _last_delta.get(key[0])
+            if update is not None and delta is not None and delta[1] == key[1]:
+                old = _derived_cache.get((key[0], delta[0], name))
+
+        if old is not None:
+            value = update(old, delta[2])
+        else:
+            value = builder()
+
+        with _lock:
+            for stale in [k for k in _derived_cache if k[0] == key[0] and k[2] == name and k[1] != key[1]]:
+                del _derived_cache[stale]
+            _derived_cache[key] = value
+    return value
+
+
+def clear_cache():
+    """Esvazia o cache em memória (os arquivos Parquet são mantidos)."""
+    with _lock:
+        _clean_cache.clear()
+        _derived_cache.clear()
+        _synced.clear()
+        _last_delta.clear()
+
+
+if __name__ == '__main__':
+    # Ingestão manual: python -m utils.data [caminho/do/train.csv] [--full] [--memory-mb N] [--workers N]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Ingestão do CSV de pedidos no cache Parquet.')
+    parser.add_argument('path', nargs='?', default=DATA_PATH)
+    parser.add_argument('--full', action='store_true', help='reconstrói o cache do zero')
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_LIMIT_MB, help='teto de memória por bloco')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='processos usados na limpeza dos blocos')
+    args = parser.parse_args()
+
+    if args.full or read_state(args.path) is None:
+        total = ingest(args.path, args.memory_mb, args.workers)
+        print(f'{total} linhas limpas gravadas em {cache_path(args.path)}')
+    else:
+        before = read_state(args.path)['offset']
+        ingest_incremental(args.path, args.memory_mb, args.workers)
+        after = read_state(args.path)['offset']
+        print(f'{after - before} bytes novos ingeridos em {cache_path(args.path)}')
+
+    print('Pedidos por situação das coordenadas:')
+    print(coordinate_report(load_data(columns=['coord_status'], path=args.path)).to_string())
@@ -0,0 +1,80 @@
+import numpy as np
+
+from utils.data import DATA_PATH, cached, load_data
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Colunas dos multiselects do sidebar
+FILTER_COLUMNS = ['City', 'Road_traffic_density']
+
+
+#----------------CLASSES--------------
+#-------------------------------------
+class FilterIndex:
+    """
+    Índice para aplicar os filtros do sidebar sem varrer o frame inteiro.
+
+    - As linhas ficam ordenadas por Order_Date, então o corte "até a data"
+      é uma busca binária que vira um slice.
+    - Para cada valor de City e Road_traffic_density é guardado um bitmap
+      (array booleano) das linhas que têm esse valor; a seleção de várias
+      opções é o OU dos bitmaps e filtros diferentes são combinados por E.
+
+    O frame é lido, nunca alterado. `select` devolve um slice (sem cópia)
+    quando só a data é filtrada e faz uma única seleção de linhas quando há
+    filtros de cidade/trânsito.
+    """
+
+    def __init__(self, df1, columns=FILTER_COLUMNS):
+        if not df1['Order_Date'].is_monotonic_increasing:
+            df1 = df1.sort_values('Order_Date', kind='stable').reset_index(drop=True)
+
+        self.df = df1
+        self.dates = df1['Order_Date'].to_numpy()
+        self.bitmaps = {}
+        for col in columns:
+            codes = df1[col].cat.codes.to_numpy()
+            self.bitmaps[col] = {
+                value: codes == code
+                for code, value in enumerate(df1[col].cat.categories)
+            }
+
+    def values(self, col):
+        """Valores distintos (não nulos) de uma coluna indexada."""
+        return [value for value, bitmap in self.bitmaps[col].items() if bitmap.any()]
+
+    def select(self, data_limite=None, **selecoes):
+        """
+        Retorna as linhas com Order_Date < data_limite e cujos valores estão
+        nas listas de `selecoes` (ex.: City=['Urban'], Road_traffic_density=['Low']).
+        Listas vazias ou None não filtram.
+        """
+        stop = len(self.dates)
+        if data_limite is not None:
+            stop = int(np.searchsorted(self.dates, np.datetime64(data_limite), side='left'))
+
+        mask = None
+        for col, valores in selecoes.items():
+            if not valores:
+                continue
+            col_mask = np.zeros(stop, dtype=bool)
+            for valor in valores:
+                bitmap = self.bitmaps[col].get(valor)
+                if bitmap is not None:
+                    col_mask |= bitmap[:stop]
+            if mask is None:
+                mask = col_mask
+            else:
+                mask &= col_mask
+
+        if mask is None:
+            return self.df.iloc[:stop]
+        return self.df.take(np.flatnonzero(mask))
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def load_filter_index(columns=None, path=DATA_PATH):
+    """FilterIndex sobre as colunas `columns` do dataset limpo, um por versão do CSV."""
+    name = f'filter_index:{tuple(columns) if columns else None}'
+    return cached(name, lambda: FilterIndex(load_data(columns=columns, path=path)), path)
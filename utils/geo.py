@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Mesmo raio médio da Terra usado pelo pacote `haversine` (Unit.KILOMETERS)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS_KM / 360
+
+# Tamanho padrão dos blocos: limita os arrays temporários a poucos MB
+CHUNK_SIZE = 1_000_000
+
+# Grade dos mapas: lado inicial da célula (graus, ~1,1 km) e máximo de
+# pontos enviados ao navegador
+MAP_CELL_DEG = 0.01
+MAX_MAP_POINTS = 2_000
+
+# Deslocamento que torna o índice de longitude não negativo na chave da célula
+_IX_OFFSET = 2**31
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def _haversine_block(lat1, lon1, lat2, lon2, dtype):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=dtype)) for a in (lat1, lon1, lat2, lon2))
+
+    a = np.sin((lat2 - lat1) * 0.5) ** 2
+    a += np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    # Erros de arredondamento podem deixar `a` levemente acima de 1
+    np.clip(a, 0, 1, out=a)
+    return (2 * EARTH_RADIUS_KM) * np.arcsin(np.sqrt(a))
+
+
+def haversine_np(lat1, lon1, lat2, lon2, dtype=np.float64, chunk_size=CHUNK_SIZE):
+    """
+    Distância de grande círculo (km) entre pares de coordenadas em graus.
+
+    Versão vetorizada de `haversine.haversine` que opera sobre arrays inteiros
+    (ou Series) de uma vez, em vez de uma chamada Python por linha.
+
+    dtype: np.float64 (padrão) ou np.float32 para reduzir memória pela metade.
+    chunk_size: número de linhas processadas por bloco; evita alocar vários
+        temporários do tamanho do frame inteiro em bases muito grandes.
+        Use None para processar tudo de uma vez.
+    """
+    lat1, lon1, lat2, lon2 = (np.asarray(a) for a in (lat1, lon1, lat2, lon2))
+    n = len(lat1)
+
+    if chunk_size is None or n <= chunk_size:
+        return _haversine_block(lat1, lon1, lat2, lon2, dtype).astype(dtype, copy=False)
+
+    out = np.empty(n, dtype=dtype)
+    for start in range(0, n, chunk_size):
+        sl = slice(start, start + chunk_size)
+        out[sl] = _haversine_block(lat1[sl], lon1[sl], lat2[sl], lon2[sl], dtype)
+    return out
+
+
+def delivery_distance(df1, dtype=np.float64, chunk_size=CHUNK_SIZE):
+    """Distância (km) entre restaurante e local de entrega para cada pedido."""
+    return haversine_np(
+        df1['Restaurant_latitude'],
+        df1['Restaurant_longitude'],
+        df1['Delivery_location_latitude'],
+        df1['Delivery_location_longitude'],
+        dtype=dtype,
+        chunk_size=chunk_size
+    )
+
+
+def cell_key(iy, ix):
+    """
+    Chave int64 da célula (iy, ix) da grade. A ordem das chaves é (iy, ix),
+    então as células de uma mesma faixa de latitude são contíguas.
+    """
+    return np.asarray(iy, dtype=np.int64) * 2**32 + (np.asarray(ix, dtype=np.int64) + _IX_OFFSET)
+
+
+def _merge_cells(iy, ix, count, sum_lat, sum_lon):
+    """Soma contagens e coordenadas das células com o mesmo (iy, ix)."""
+    key, inverse = np.unique(cell_key(iy, ix), return_inverse=True)
+    iy = key // 2**32
+    ix = key % 2**32 - _IX_OFFSET
+    return (
+        iy,
+        ix,
+        np.bincount(inverse, weights=count),
+        np.bincount(inverse, weights=sum_lat),
+        np.bincount(inverse, weights=sum_lon),
+    )
+
+
+def grid_bins(lat, lon, cell_deg=MAP_CELL_DEG, max_points=MAX_MAP_POINTS):
+    """
+    Agrupa pontos em uma grade regular de `cell_deg` graus, de forma vetorizada.
+
+    Retorna um DataFrame com uma linha por célula ocupada: centróide dos
+    pontos (lat, lon) e quantidade (count), e o lado final da célula. Se
+    houver mais de `max_points` células, a grade é dobrada até caber; como
+    floor(floor(x / c) / 2) == floor(x / 2c), cada nível é agregado a partir
+    das células do nível anterior, sem voltar aos pontos.
+
+    Pontos com coordenada ausente são ignorados.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ok = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon = lat[ok], lon[ok]
+
+    cells = _merge_cells(
+        np.floor(lat / cell_deg).astype(np.int64),
+        np.floor(lon / cell_deg).astype(np.int64),
+        np.ones(len(lat)),
+        lat,
+        lon,
+    )
+    while len(cells[0]) > max_points:
+        iy, ix, count, sum_lat, sum_lon = cells
+        cells = _merge_cells(iy // 2, ix // 2, count, sum_lat, sum_lon)
+        cell_deg *= 2
+
+    _, _, count, sum_lat, sum_lon = cells
+    bins = pd.DataFrame({
+        'lat': sum_lat / count,
+        'lon': sum_lon / count,
+        'count': count.astype(np.int64),
+    })
+    return bins, cell_deg
+
+
+def delivery_bins(df1, cell_deg=MAP_CELL_DEG, max_points=MAX_MAP_POINTS):
+    """Locais de entrega agregados em grade (ver `grid_bins`)."""
+    return grid_bins(
+        df1['Delivery_location_latitude'],
+        df1['Delivery_location_longitude'],
+        cell_deg=cell_deg,
+        max_points=max_points,
+    )
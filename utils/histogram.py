@@ -0,0 +1,131 @@
+"""
+Histogramas do tempo de entrega por dia × City × Road_traffic_density ×
+Festival.
+
+O tempo de entrega é um número inteiro de minutos, então cada célula guarda
+a contagem de pedidos em cada minuto (colunas BIN_COLUMNS, de 0 a
+MAX_MINUTES; o último bin acumula os tempos maiores). Somar células é
+exato: percentis (p50/p90/p99) e distribuições de qualquer seleção do
+sidebar saem do histograma somado, sem voltar aos pedidos, e batem com o
+`quantile` do pandas (interpolação linear) enquanto nenhum tempo passa de
+MAX_MINUTES. Linhas novas no CSV são agregadas e somadas às células.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_PATH, cached, load_data
+from utils.profiling import timed
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+KEYS = ['Order_Date', 'City', 'Road_traffic_density', 'Festival']
+MEASURE = 'Time_taken(min)'
+
+# Um bin por minuto; tempos acima de MAX_MINUTES caem no último bin
+MAX_MINUTES = 120
+BIN_COLUMNS = [f'min_{minute:03d}' for minute in range(MAX_MINUTES + 1)]
+
+PERCENTILES = [50, 90, 99]
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def build_histograms(df1):
+    """Histogramas do tempo de entrega de `df1`, uma linha por célula de KEYS."""
+    grouped = df1.groupby(KEYS, observed=True, dropna=False, sort=True)
+    gid = grouped.ngroup().to_numpy()
+    cells = grouped.size().index.to_frame(index=False)
+
+    minutes = df1[MEASURE].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(minutes)
+    bins = np.clip(np.floor(minutes[valid]), 0, MAX_MINUTES).astype(np.int64)
+    counts = np.bincount(
+        gid[valid] * len(BIN_COLUMNS) + bins,
+        minlength=len(cells) * len(BIN_COLUMNS)
+    ).reshape(len(cells), len(BIN_COLUMNS))
+    return pd.concat([cells, pd.DataFrame(counts.astype(np.int32), columns=BIN_COLUMNS)], axis=1)
+
+
+def merge_histograms(hist, new_orders):
+    """
+    Soma aos histogramas os pedidos de `new_orders` (já limpos): células
+    existentes têm as contagens somadas e as novas são acrescentadas.
+    """
+    aux = pd.concat([hist, build_histograms(new_orders)], ignore_index=True)
+    # Categorias podem diferir entre os histogramas e o delta
+    for col in KEYS[1:]:
+        aux[col] = aux[col].astype('category')
+    merged = aux.groupby(KEYS, observed=True, dropna=False, sort=True)[BIN_COLUMNS].sum()
+    return merged.astype(np.int32).reset_index()
+
+
+@timed('histograms')
+def load_histograms(path=DATA_PATH):
+    """
+    Histogramas do dataset limpo, calculados uma vez por versão do CSV e
+    atualizados incrementalmente quando o CSV apenas recebe linhas novas.
+    """
+    return cached(
+        'histograms',
+        lambda: build_histograms(load_data(columns=KEYS + [MEASURE], path=path)),
+        path,
+        update=merge_histograms
+    )
+
+
+def distribution(hist, by=()):
+    """
+    Histograma somado por `by` (lista; vazia = total geral): um frame com as
+    colunas `by` e BIN_COLUMNS. Grupos com dimensão nula são descartados.
+    """
+    by = list(by)
+    if not by:
+        return hist[BIN_COLUMNS].sum().to_frame().T.astype(np.int64)
+    return hist.groupby(by, observed=True, sort=True)[BIN_COLUMNS].sum().reset_index()
+
+
+def quantiles(counts, qs):
+    """
+    Quantis `qs` (entre 0 e 1) de cada linha de `counts` (matriz de
+    contagens por minuto), com a interpolação linear do pandas. Retorna uma
+    matriz (linhas × len(qs)), NaN para linhas vazias.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    cum = counts.cumsum(axis=1)
+    n = cum[:, -1]
+    out = np.full((len(counts), len(qs)), np.nan)
+    for row in np.flatnonzero(n > 0):
+        pos = (n[row] - 1) * np.asarray(qs, dtype=np.float64)
+        lower = np.floor(pos)
+        # Minuto do k-ésimo pedido (0-based) na ordem crescente
+        lo = np.searchsorted(cum[row], lower, side='right')
+        hi = np.searchsorted(cum[row], np.ceil(pos), side='right')
+        out[row] = lo + (pos - lower) * (hi - lo)
+    return out
+
+
+def percentiles(hist, by=(), percentiles=PERCENTILES):
+    """
+    Pedidos ('count') e percentis do tempo de entrega ('p50', 'p90', ...)
+    por `by` (lista; vazia = total geral).
+    """
+    dist = distribution(hist, by)
+    counts = dist[BIN_COLUMNS].to_numpy()
+    out = dist.drop(columns=BIN_COLUMNS)
+    out['count'] = counts.sum(axis=1)
+    values = quantiles(counts, [p / 100 for p in percentiles])
+    for i, p in enumerate(percentiles):
+        out[f'p{p}'] = values[:, i]
+    return out
+
+
+def long_distribution(hist, by=()):
+    """
+    Distribuição em formato longo para gráficos: colunas `by`, 'minutes' e
+    'orders', só com os minutos que têm pedidos.
+    """
+    by = list(by)
+    dist = distribution(hist, by)
+    out = dist.melt(id_vars=by, value_vars=BIN_COLUMNS, var_name='minutes', value_name='orders')
+    out['minutes'] = out['minutes'].str.removeprefix('min_').astype(np.int16)
+    return out.loc[out['orders'] > 0].sort_values(by + ['minutes'], ignore_index=True)
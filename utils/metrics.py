@@ -0,0 +1,480 @@
+"""
+API "headless" das métricas do dashboard.
+
+Cada visão tem uma função `<visao>_metrics(filters)` que devolve um
+dicionário de DataFrames/números prontos para exibir, sem nenhuma chamada
+ao Streamlit. As páginas apenas renderizam esses resultados; a mesma API
+pode ser usada em jobs batch, benchmarks e caches.
+
+Os resultados ficam em um cache LRU por página (utils.cache), com chave
+(versão do CSV, Filters): voltar a uma combinação de filtros já vista não
+recalcula nada. Páginas com abas podem pedir só a seção da aba aberta
+(ex.: `company_metrics(filters, secao='geografica')`); as demais seções
+são calculadas quando a aba é aberta, ou em segundo plano com `prefetch`.
+
+As funções `compute_<visao>(rows, cube)` fazem o cálculo a partir das
+linhas já filtradas e do cubo já filtrado, para uso com dados que não vêm
+do `train.csv` (ex.: benchmarks com dados sintéticos).
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.activity import build_activity, load_activity
+from utils.cache import result_cache
+from utils.cleaning import valid_coordinates
+from utils.couriers import PAGE_SIZE, load_courier_table, page_profiles, search_profiles
+from utils.data import DATA_PATH, data_version
+from utils.filters import load_filter_index
+from utils.geo import delivery_bins
+from utils.histogram import build_histograms, load_histograms, long_distribution, percentiles
+from utils.profiling import timed, timer
+from utils.rollup import filter_rollup, load_rollup, reduce_rollup, summarize
+from utils.spatial import load_delivery_index, load_restaurant_index
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Colunas de linhas (não agregadas) usadas por cada visão
+COMPANY_COLUMNS = [
+    'Order_Date',
+    'City',
+    'Road_traffic_density',
+    'Delivery_location_latitude',
+    'Delivery_location_longitude',
+    'coord_status',
+]
+COURIER_COLUMNS = [
+    'Delivery_person_ID',
+    'Delivery_person_Age',
+    'Vehicle_condition',
+    'Order_Date',
+    'City',
+    'Road_traffic_density',
+    'Time_taken(min)',
+]
+
+TRAFFIC_OPTIONS = ['Low', 'Medium', 'High', 'Jam']
+
+# Tamanho padrão dos rankings de entregadores (por cidade)
+TOP_K = 10
+
+
+#----------------CLASSES--------------
+#-------------------------------------
+class Filters(NamedTuple):
+    """
+    Estado normalizado do sidebar: data limite (exclusiva), cidades e
+    condições de trânsito selecionadas (tuplas ordenadas; vazia = todas).
+    """
+    data_limite: Optional[datetime] = None
+    cidades: Tuple[str, ...] = ()
+    transito: Tuple[str, ...] = ()
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def make_filters(data_limite=None, cidades=(), transito=()):
+    """Cria um Filters a partir dos valores brutos dos widgets do sidebar."""
+    return Filters(
+        data_limite,
+        tuple(sorted(cidades or ())),
+        tuple(sorted(opt.capitalize() for opt in (transito or ()))),
+    )
+
+
+def available_cities(path=DATA_PATH):
+    """Cidades presentes no dataset, para as opções do sidebar."""
+    return load_filter_index(COMPANY_COLUMNS, path).values('City')
+
+
+def cached_metrics(page, filters, compute, path=DATA_PATH, *extra):
+    """
+    Resultado de `compute()` no cache da página, por versão do CSV, filtros
+    e parâmetros adicionais da página (`extra`).
+    """
+    with timer(f'metrics:{page}'):
+        return result_cache(page).get_or_compute((data_version(path), filters) + extra, compute)
+
+
+@timed('filter')
+def select_rows(columns, filters, path=DATA_PATH):
+    """Linhas (só `columns`) do dataset filtradas pelo estado do sidebar."""
+    return load_filter_index(columns, path).select(
+        filters.data_limite,
+        City=list(filters.cidades),
+        Road_traffic_density=list(filters.transito)
+    )
+
+
+@timed('filter')
+def select_cube(filters, path=DATA_PATH):
+    """Cubo do dataset filtrado pelo estado do sidebar."""
+    return filter_rollup(load_rollup(path), filters.data_limite, list(filters.cidades), list(filters.transito))
+
+
+@timed('filter')
+def select_activity(filters, path=DATA_PATH):
+    """Store de atividade filtrado pelo estado do sidebar."""
+    return load_activity(path).filter(filters.data_limite, list(filters.cidades), list(filters.transito))
+
+
+def select(columns, filters, path=DATA_PATH):
+    """Linhas e cubo do dataset filtrados pelo estado do sidebar."""
+    return select_rows(columns, filters, path), select_cube(filters, path)
+
+
+@timed('filter')
+def select_histograms(filters, path=DATA_PATH):
+    """Histogramas do tempo de entrega filtrados pelo estado do sidebar."""
+    return filter_rollup(load_histograms(path), filters.data_limite, list(filters.cidades), list(filters.transito))
+
+
+def time_percentiles(hist, by=()):
+    """
+    Pedidos e percentis do tempo de entrega (histogram.PERCENTILES) por `by`;
+    sem `by`, uma Series com o total geral.
+    """
+    out = percentiles(hist, by)
+    return out.iloc[0] if not by else out
+
+
+# ---------------- Visão Empresa ----------------
+def orders_by_day(cube):
+    df_aux = summarize(cube, ['Order_Date'])
+    df_aux.columns = ['Order_Date', 'Qtd_Orders']
+    return df_aux
+
+
+def traffic_order_share(cube):
+    df_aux = summarize(cube, ['Road_traffic_density']).rename(columns={'orders': 'ID'})
+    df_aux['perc_ID'] = 100 * (df_aux['ID'] / df_aux['ID'].sum())
+    return df_aux
+
+
+def traffic_order_city(cube):
+    df_aux = summarize(cube, ['City', 'Road_traffic_density']).rename(columns={'orders': 'ID'})
+    df_aux['perc_ID'] = 100 * (df_aux['ID'] / df_aux['ID'].sum())
+    return df_aux
+
+
+def order_by_week(activity):
+    """
+    Pedidos por entregador distinto em cada semana ISO, com o crescimento
+    semana contra semana, a partir do store de atividade já filtrado.
+    """
+    return activity.weekly().rename(columns={'orders': 'ID', 'couriers': 'Delivery_person_ID'})
+
+
+def rolling_orders(activity):
+    """Pedidos por entregador nas janelas móveis de 7 e 28 dias."""
+    return activity.rolling()
+
+
+def order_share_by_week(cube):
+    """Participação (%) de cada semana nos pedidos; None se não houver pedidos."""
+    df_aux = (
+        summarize(cube, ['week_of_year'])
+           .rename(columns={'orders': 'ID'})
+           .sort_values('week_of_year')
+    )
+    total = df_aux['ID'].sum()
+    if total == 0 or pd.isna(total):
+        return None
+    df_aux['perc_ID'] = 100 * (df_aux['ID'] / total)
+    return df_aux
+
+
+def city_traffic_centers(df1):
+    """Localização central (mediana) das entregas por cidade e tipo de tráfego."""
+    columns = ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']
+    return (
+        df1.loc[:, columns]
+           .groupby(['City', 'Road_traffic_density'], observed=True)
+           .median()
+           .reset_index()
+    )
+
+
+@timed('aggregate:gerencial')
+def company_gerencial(cube):
+    return {
+        'orders_by_day': orders_by_day(cube),
+        'traffic_order_share': traffic_order_share(cube),
+        'traffic_order_city': traffic_order_city(cube),
+    }
+
+
+@timed('aggregate:tatica')
+def company_tatica(cube, activity):
+    return {
+        'order_by_week': order_by_week(activity),
+        'rolling_orders': rolling_orders(activity),
+        'order_share_by_week': order_share_by_week(cube),
+    }
+
+
+@timed('aggregate:geografica')
+def company_geografica(rows):
+    # Mapas só com coordenadas válidas (ver cleaning.validate_coordinates)
+    entregas = valid_coordinates(rows)
+    return {
+        'city_traffic_centers': city_traffic_centers(entregas),
+        'delivery_bins': delivery_bins(entregas)[0],
+    }
+
+
+# Seções (abas) da Visão Empresa: função e entradas de que ela precisa
+# ('rows' = linhas filtradas, 'cube' = cubo filtrado, 'activity' = store de
+# atividade filtrado). Só as entradas das seções pedidas são montadas.
+COMPANY_SECTIONS = {
+    'gerencial': (company_gerencial, ['cube']),
+    'tatica': (company_tatica, ['cube', 'activity']),
+    'geografica': (company_geografica, ['rows']),
+}
+
+
+def company_inputs(secoes=None):
+    """Entradas necessárias às seções `secoes` (None = todas)."""
+    return {name for secao in secoes or COMPANY_SECTIONS for name in COMPANY_SECTIONS[secao][1]}
+
+
+def compute_company(rows=None, cube=None, secoes=None, activity=None):
+    """
+    Métricas das seções `secoes` (lista de chaves de COMPANY_SECTIONS; None =
+    todas), a partir das entradas já filtradas de que elas precisam.
+    `activity`, se não for informado e alguma seção precisar dele, é montado
+    a partir de `rows` (que então precisam de Delivery_person_ID).
+    """
+    if activity is None and 'activity' in company_inputs(secoes):
+        activity = build_activity(rows)
+    inputs = {'rows': rows, 'cube': cube, 'activity': activity}
+
+    metricas = {}
+    for secao in secoes or COMPANY_SECTIONS:
+        section, needs = COMPANY_SECTIONS[secao]
+        metricas.update(section(**{name: inputs[name] for name in needs}))
+    return metricas
+
+
+def company_metrics(filters, path=DATA_PATH, secao=None):
+    """
+    Métricas da Visão Empresa para o estado `filters` do sidebar: todas, ou
+    só as da seção `secao` (chave de COMPANY_SECTIONS), cada uma no cache.
+    Só são filtradas as entradas que a seção usa.
+    """
+    secoes = [secao] if secao else None
+
+    def compute():
+        loaders = {
+            'rows': lambda: select_rows(COMPANY_COLUMNS, filters, path),
+            'cube': lambda: select_cube(filters, path),
+            'activity': lambda: select_activity(filters, path),
+        }
+        inputs = {name: loaders[name]() for name in company_inputs(secoes)}
+        return compute_company(secoes=secoes, **inputs)
+
+    return cached_metrics('empresa', filters, compute, path, secao)
+
+
+def prefetch(metrics_fn, filters, secoes, path=DATA_PATH):
+    """
+    Calcula em segundo plano (thread daemon) as seções `secoes` de
+    `metrics_fn`, deixando-as no cache para quando a aba for aberta.
+    """
+    def run():
+        for secao in secoes:
+            metrics_fn(filters, path, secao=secao)
+
+    thread = threading.Thread(target=run, name='prefetch-metricas', daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------------- Visão Entregadores ----------------
+def top_delivery(df1, k=TOP_K):
+    """
+    Os `k` entregadores mais rápidos e os `k` mais lentos de cada cidade
+    presente nos dados, pelo tempo médio de entrega.
+
+    A média por (cidade, entregador) é calculada uma única vez e cada cidade
+    passa por uma seleção parcial (nsmallest/nlargest), sem ordenar a tabela
+    inteira de entregadores. Retorna (fastest, slowest), com as colunas
+    City, Delivery_person_ID e Time_taken(min).
+    """
+    tempo_medio = (
+        df1.groupby(['City', 'Delivery_person_ID'], observed=True)['Time_taken(min)']
+           .mean()
+           .groupby(level='City', observed=True, group_keys=False)
+    )
+    fastest = tempo_medio.nsmallest(k).reset_index()
+    slowest = tempo_medio.nlargest(k).reset_index()
+    return fastest, slowest
+
+
+def ratings_by(cube, by):
+    """Avaliação média dos entregadores por `by` (coluna do cubo)."""
+    return (
+        summarize(cube, [by], 'rating')
+           .loc[:, [by, 'mean']]
+           .rename(columns={'mean': 'Delivery_person_Ratings'})
+    )
+
+
+@timed('aggregate:entregadores')
+def compute_courier(rows, cube, k=TOP_K, hist=None):
+    """
+    Métricas da Visão Entregadores. `hist` são os histogramas do tempo de
+    entrega já filtrados; se não forem informados, são montados a partir de
+    `rows` (que então precisam de Festival).
+    """
+    if hist is None:
+        hist = build_histograms(rows)
+    fastest, slowest = top_delivery(rows, k)
+    return {
+        'maior_idade': rows['Delivery_person_Age'].max(),
+        'menor_idade': rows['Delivery_person_Age'].min(),
+        'melhor_condicao': rows['Vehicle_condition'].max(),
+        'pior_condicao': rows['Vehicle_condition'].min(),
+        'ratings_by_traffic': ratings_by(cube, 'Road_traffic_density'),
+        'ratings_by_weather': ratings_by(cube, 'Weather_clean'),
+        'fastest': fastest,
+        'slowest': slowest,
+        'time_percentiles': time_percentiles(hist),
+        'time_percentiles_by_traffic': time_percentiles(hist, ['Road_traffic_density']),
+    }
+
+
+def courier_metrics(filters, path=DATA_PATH, k=TOP_K):
+    """Métricas da Visão Entregadores para o estado `filters` do sidebar (rankings top-`k`)."""
+    def compute():
+        rows, cube = select(COURIER_COLUMNS, filters, path)
+        return compute_courier(rows, cube, k, select_histograms(filters, path))
+
+    return cached_metrics('entregadores', filters, compute, path, k)
+
+
+def courier_profiles(termo='', pagina=1, por_pagina=PAGE_SIZE, path=DATA_PATH):
+    """
+    Uma página da tabela de perfis dos entregadores (todos os pedidos, sem
+    os filtros do sidebar), só com os IDs que contêm `termo`. Retorna
+    {'perfis': página, 'pagina': página exibida, 'paginas': total de
+    páginas, 'encontrados': entregadores que atendem à busca}.
+    """
+    table = load_courier_table(path)
+    rows = result_cache('perfis').get_or_compute(
+        (data_version(path), termo.strip().lower()),
+        lambda: search_profiles(table, termo)
+    )
+    perfis, paginas = page_profiles(table, rows, pagina, por_pagina)
+    return {
+        'perfis': perfis,
+        'pagina': min(max(1, pagina), paginas),
+        'paginas': paginas,
+        'encontrados': len(rows),
+    }
+
+
+# ---------------- Visão Restaurantes ----------------
+def overall_mean(cube, measure):
+    return np.round(summarize(cube, [], measure)['mean'].iloc[0], 2)
+
+
+def invalid_coordinates(cube):
+    """
+    Pedidos sem distância no cubo: a limpeza só calcula `distancia_km` para
+    coordenadas válidas, então são os pedidos com coordenadas inválidas.
+    """
+    return int(cube['orders'].sum() - cube['dist_n'].sum())
+
+
+def festival_time_stats(cube):
+    """Média e desvio padrão do tempo de entrega com (Yes) e sem (No) festival."""
+    stats = summarize(cube, ['Festival'], 'time').set_index('Festival')
+    return stats.reindex(['Yes', 'No']).loc[:, ['mean', 'std']].round(2)
+
+
+def time_by(cube, by):
+    """Média e desvio padrão do tempo de entrega por `by` (lista de colunas)."""
+    return summarize(cube, by, 'time').loc[:, by + ['mean', 'std']]
+
+
+def distinct_counts(activity):
+    """
+    Entregadores e restaurantes distintos do store de atividade filtrado, e
+    se cada contagem é exata (senão é estimativa HLL, erro relativo típico
+    de sketch.hll_error()).
+    """
+    return {
+        'entregadores': activity.distinct('couriers'),
+        'restaurantes': activity.distinct('restaurants'),
+        'distintos_exatos': activity.is_exact('couriers') and activity.is_exact('restaurants'),
+    }
+
+
+@timed('aggregate:restaurante')
+def compute_restaurant(rows=None, cube=None, activity=None, hist=None):
+    """
+    Métricas da Visão Restaurantes a partir do cubo filtrado. `activity` é o
+    store de atividade e `hist` os histogramas do tempo de entrega, já
+    filtrados; só se não forem informados são montados a partir de `rows`
+    (que então precisam de Delivery_person_ID, das coordenadas dos
+    restaurantes, Festival e Time_taken(min)).
+    """
+    if activity is None:
+        activity = build_activity(rows)
+    if hist is None:
+        hist = build_histograms(rows)
+    # Uma passada pelo cubo filtrado; os widgets agregam o cubo reduzido
+    cube = reduce_rollup(cube, ['City', 'Road_traffic_density', 'Festival', 'Type_of_order'])
+    return {
+        **distinct_counts(activity),
+        'distancia_media': overall_mean(cube, 'dist'),
+        'coordenadas_invalidas': invalid_coordinates(cube),
+        'preparo_medio': overall_mean(cube, 'prep'),
+        'festival': festival_time_stats(cube),
+        'orders_by_city': summarize(cube, ['City']).set_index('City')['orders'],
+        'time_by_city': time_by(cube, ['City']),
+        'time_by_order_type': time_by(cube, ['Type_of_order']),
+        'time_by_city_traffic': time_by(cube, ['City', 'Road_traffic_density']),
+        'time_percentiles': time_percentiles(hist),
+        'time_percentiles_by_city': time_percentiles(hist, ['City']),
+        'time_distribution': long_distribution(hist, ['Festival']),
+    }
+
+
+def restaurant_metrics(filters, path=DATA_PATH):
+    """Métricas da Visão Restaurantes para o estado `filters` do sidebar."""
+    def compute():
+        return compute_restaurant(
+            cube=select_cube(filters, path),
+            activity=select_activity(filters, path),
+            hist=select_histograms(filters, path)
+        )
+
+    return cached_metrics('restaurante', filters, compute, path)
+
+
+# ---------------- Consultas espaciais ----------------
+def nearby(index, lat, lon, raio_km=None, k=5):
+    """Pontos de `index` a até `raio_km` km de (lat, lon); sem raio, os `k` mais próximos."""
+    if raio_km is None:
+        return index.nearest(lat, lon, k)
+    return index.within(lat, lon, raio_km)
+
+
+def nearby_restaurants(lat, lon, raio_km=None, k=5, path=DATA_PATH):
+    """
+    Restaurantes (coordenadas válidas) próximos de (lat, lon), com pedidos,
+    tempo médio de entrega e a distância `dist_km`, do mais próximo para o
+    mais distante.
+    """
+    return nearby(load_restaurant_index(path), lat, lon, raio_km, k)
+
+
+def nearby_deliveries(lat, lon, raio_km=None, k=5, path=DATA_PATH):
+    """Pedidos entregues perto de (lat, lon), com a distância `dist_km`."""
+    return nearby(load_delivery_index(path), lat, lon, raio_km, k)
@@ -0,0 +1,136 @@
+"""
+Medição de tempo e memória das etapas de cada rerun das páginas.
+
+Uso:
+    start_run('empresa', enabled=True)      # no topo do script da página
+    with timer('render:mapa'):              # blocos da página
+        ...
+    @timed('load')                          # funções de utils
+    def load_data(...): ...
+    registros = finish_run()                # no fim do script
+
+Cada registro tem a etapa, o tempo (s), a variação de memória residente do
+processo (MB) e a profundidade (etapas aninhadas). Sem um rerun ativo com
+medição ligada, `timed` e `timer` só chamam a função / não fazem nada: o
+custo é uma leitura de ContextVar.
+
+O estado fica em uma ContextVar, então cada sessão (thread do Streamlit)
+mede apenas o próprio rerun; threads de segundo plano (aquecimento,
+prefetch) não são medidas. Se a variável de ambiente CURRY_PROFILE_LOG
+apontar para um arquivo, cada rerun medido é acrescentado a ele como uma
+linha JSON.
+"""
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+LOG_PATH_ENV = 'CURRY_PROFILE_LOG'
+
+try:
+    _PAGE_MB = os.sysconf('SC_PAGE_SIZE') / 2**20
+except (AttributeError, ValueError, OSError):
+    _PAGE_MB = None
+
+_run = ContextVar('profiling_run', default=None)
+_NULL = nullcontext()
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def rss_mb():
+    """Memória residente do processo (MB), ou None fora do Linux."""
+    if _PAGE_MB is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except OSError:
+        return None
+
+
+def start_run(page, enabled=True):
+    """Inicia a medição de um rerun de `page` (ou a desliga, com enabled=False)."""
+    run = {'page': page, 'started_at': datetime.now().isoformat(timespec='seconds'),
+           'depth': 0, 'records': [], 't0': time.perf_counter()} if enabled else None
+    _run.set(run)
+    return run
+
+
+def active():
+    return _run.get() is not None
+
+
+@contextmanager
+def _measure(stage, run):
+    run['depth'] += 1
+    rss0 = rss_mb()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        rss1 = rss_mb()
+        run['depth'] -= 1
+        run['records'].append({
+            'stage': stage,
+            'seconds': seconds,
+            'rss_delta_mb': None if rss0 is None or rss1 is None else rss1 - rss0,
+            'depth': run['depth'],
+        })
+
+
+def timer(stage):
+    """Context manager que mede o bloco como a etapa `stage` do rerun ativo."""
+    run = _run.get()
+    if run is None:
+        return _NULL
+    return _measure(stage, run)
+
+
+def timed(stage):
+    """Decorator que mede cada chamada da função como a etapa `stage`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            run = _run.get()
+            if run is None:
+                return fn(*args, **kwargs)
+            with _measure(stage, run):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_run():
+    """
+    Encerra o rerun ativo e retorna o relatório {'page', 'started_at',
+    'seconds', 'records'} (None se a medição estava desligada). Os registros
+    ficam na ordem em que as etapas terminaram.
+    """
+    run = _run.get()
+    if run is None:
+        return None
+    _run.set(None)
+
+    report = {
+        'page': run['page'],
+        'started_at': run['started_at'],
+        'seconds': time.perf_counter() - run['t0'],
+        'records': run['records'],
+    }
+    log_path = os.environ.get(LOG_PATH_ENV)
+    if log_path:
+        with open(log_path, 'a') as f:
+            f.write(to_jsonl(report))
+    return report
+
+
+def to_jsonl(report):
+    """Relatório de um rerun como uma linha JSON."""
+    return json.dumps(report, ensure_ascii=False) + '\n'
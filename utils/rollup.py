@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+from utils.data import DATA_PATH, cached, load_data
+from utils.profiling import timed
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Dimensões do cubo: as do sidebar (data, cidade, trânsito) e as usadas
+# nos agrupamentos dos gráficos
+DIMENSIONS = [
+    'Order_Date',
+    'City',
+    'Road_traffic_density',
+    'Weather_clean',
+    'Festival',
+    'Type_of_order',
+]
+
+# Medidas agregadas: nome curto -> coluna do dataset limpo
+MEASURES = {
+    'time': 'Time_taken(min)',
+    'rating': 'Delivery_person_Ratings',
+    'dist': 'distancia_km',
+    'prep': 'prep_time',
+}
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def build_rollup(df1):
+    """
+    Pré-agrega os pedidos por todas as combinações de DIMENSIONS.
+
+    Cada linha do cubo guarda:
+    - orders: quantidade de pedidos
+    - <medida>_n, <medida>_mean, <medida>_m2: contagem de valores não nulos,
+      média e soma dos quadrados dos desvios em relação à média (M2) de cada
+      medida de MEASURES (média e M2 valem 0 quando n == 0)
+
+    Com esses momentos qualquer média, desvio padrão ou participação pode ser
+    obtida a partir do cubo, cujo tamanho depende apenas do número de
+    combinações de dimensões e não do número de pedidos. Guardar M2 em vez
+    da soma dos quadrados evita o cancelamento numérico de
+    sumsq - sum²/n, então o desvio padrão bate com o `std(ddof=1)` do pandas.
+    Valores nulos nas dimensões formam suas próprias células.
+    """
+    # Medidas float32 são agregadas em float64, como o cubo guarda os
+    # momentos; assim o cubo atualizado (merge_rollup) bate com o recalculado
+    df1 = df1.assign(**{col: df1[col].astype(np.float64) for col in MEASURES.values()})
+    grouped = df1.groupby(DIMENSIONS, observed=True, dropna=False)
+    aggs = {'orders': (DIMENSIONS[0], 'size')}
+    for name, col in MEASURES.items():
+        aggs[f'{name}_n'] = (col, 'count')
+        aggs[f'{name}_mean'] = (col, 'mean')
+        aggs[f'{name}_var'] = (col, 'var')
+    cube = grouped.agg(**aggs).reset_index()
+
+    for name in MEASURES:
+        n = cube[f'{name}_n']
+        cube[f'{name}_mean'] = cube[f'{name}_mean'].astype(np.float64).fillna(0)
+        cube[f'{name}_m2'] = (cube.pop(f'{name}_var').astype(np.float64) * (n - 1)).fillna(0)
+
+    cube['week_of_year'] = cube['Order_Date'].dt.isocalendar().week.astype(np.int8)
+    return cube
+
+
+def combine(parts, by, measures=MEASURES, dropna=True):
+    """
+    Junta linhas com momentos (orders, <m>_n, <m>_mean, <m>_m2) pelas
+    colunas `by` (lista; vazia = total geral), em uma única passada.
+
+    Usa a fórmula de combinação de Chan et al.: a média do grupo é a média
+    ponderada por n e M2 = soma(M2_i) + soma(n_i * (média_i - média)²).
+    Retorna um frame com o mesmo esquema, uma linha por grupo. Com `dropna`
+    os grupos com dimensão nula são descartados, como no groupby.
+    """
+    if by:
+        grouped = parts.groupby(by, observed=True, dropna=dropna, sort=True)
+        ids = grouped.ngroup().to_numpy(dtype=np.float64, na_value=np.nan)
+        out = grouped.size().index.to_frame(index=False)
+    else:
+        ids = np.zeros(len(parts))
+        out = pd.DataFrame(index=range(1))
+
+    keep = ids >= 0
+    ids = ids[keep].astype(np.int64)
+    size = len(out)
+
+    def total(values):
+        return np.bincount(ids, weights=np.asarray(values, dtype=np.float64)[keep], minlength=size)
+
+    out['orders'] = total(parts['orders']).astype(np.int64)
+    for name in measures:
+        n_i = parts[f'{name}_n'].to_numpy(dtype=np.float64)
+        mean_i = parts[f'{name}_mean'].to_numpy(dtype=np.float64)
+        n = total(n_i)
+        mean = np.divide(total(n_i * mean_i), n, out=np.zeros(size), where=n > 0)
+        dev = mean_i[keep] - mean[ids]
+        m2 = total(parts[f'{name}_m2']) + np.bincount(ids, weights=n_i[keep] * dev * dev, minlength=size)
+
+        out[f'{name}_n'] = n.astype(np.int64)
+        out[f'{name}_mean'] = mean
+        out[f'{name}_m2'] = m2
+    return out
+
+
+def merge_rollup(cube, new_orders):
+    """
+    Soma ao cubo as linhas novas (já limpas) sem reprocessar os pedidos
+    antigos: as células existentes têm seus momentos combinados e as novas
+    combinações de dimensões são acrescentadas.
+    """
+    delta = build_rollup(new_orders)
+    aux = pd.concat([cube, delta], ignore_index=True)
+    # Categorias podem diferir entre o cubo e o delta
+    for col in DIMENSIONS:
+        if col != 'Order_Date':
+            aux[col] = aux[col].astype('category')
+    merged = combine(aux, DIMENSIONS, dropna=False)
+    merged['week_of_year'] = merged['Order_Date'].dt.isocalendar().week.astype(np.int8)
+    return merged
+
+
+@timed('rollup')
+def load_rollup(path=DATA_PATH):
+    """
+    Cubo do dataset limpo, calculado uma vez por versão do CSV e atualizado
+    incrementalmente quando o CSV apenas recebe linhas novas.
+    """
+    return cached(
+        'rollup',
+        lambda: build_rollup(load_data(columns=DIMENSIONS + list(MEASURES.values()), path=path)),
+        path,
+        update=merge_rollup
+    )
+
+
+def filter_rollup(cube, data_limite=None, cidades=None, transito=None):
+    """
+    Aplica ao cubo os mesmos filtros do sidebar das páginas.
+
+    data_limite: mantém datas anteriores a ela
+    cidades, transito: listas de valores aceitos (lista vazia ou None = sem filtro)
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    if data_limite is not None:
+        mask &= (cube['Order_Date'] < data_limite).to_numpy()
+    if cidades:
+        mask &= cube['City'].isin(cidades).to_numpy()
+    if transito:
+        mask &= cube['Road_traffic_density'].isin(transito).to_numpy()
+    return cube.loc[mask]
+
+
+def reduce_rollup(cube, dims):
+    """
+    Cubo reduzido às dimensões `dims`, com o mesmo esquema de momentos.
+
+    Quando um widget precisa de vários agrupamentos sobre as mesmas
+    dimensões, o cubo filtrado é percorrido uma única vez aqui e cada
+    `summarize` seguinte trabalha sobre o cubo reduzido (bem menor). Os nulos
+    das dimensões são mantidos para não alterar os totais.
+    """
+    return combine(cube, list(dims), dropna=False)
+
+
+def summarize(cube, by, measure=None):
+    """
+    Agrega o cubo pelas colunas `by` (lista; vazia = total geral).
+
+    Retorna um DataFrame com 'orders' e, se `measure` for informado (chave de
+    MEASURES), também 'count', 'mean' e 'std' (ddof=1, como no pandas) da
+    medida. Grupos com dimensão nula são descartados, como no groupby.
+    """
+    measures = [] if measure is None else [measure]
+    out = combine(cube, by, measures)
+
+    if measure is not None:
+        n = out.pop(f'{measure}_n')
+        mean = out.pop(f'{measure}_mean')
+        m2 = out.pop(f'{measure}_m2')
+        out['count'] = n
+        out['mean'] = mean.where(n > 0)
+        out['std'] = np.sqrt(m2 / (n - 1)).where(n > 1)
+
+    return out
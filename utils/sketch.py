@@ -0,0 +1,82 @@
+"""
+Contagem de distintos: hashes de 64 bits e sketches HyperLogLog mescláveis.
+
+Um sketch HLL de precisão p tem m = 2**p registradores de 1 byte. Sketches
+de células diferentes são unidos pelo máximo registrador a registrador, então
+a contagem de distintos de qualquer combinação de células sai da união de
+poucos arrays, sem revisitar os dados.
+
+Erro: o erro padrão relativo da estimativa é 1.04 / sqrt(m) (`hll_error`),
+~1.6% com p = 12 (4 KB por sketch); em ~95% dos casos a estimativa fica a
+até 2 erros padrão (~3.3%) do valor exato. Para poucos distintos (contagem
+linear <= 3 m) usa-se a contagem linear de registradores vazios, mais
+precisa nessa faixa, onde a estimativa bruta do HLL tem viés positivo.
+"""
+import numpy as np
+import pandas as pd
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+HLL_PRECISION = 12
+
+# Casas decimais das coordenadas que identificam um restaurante (~11 m)
+RESTAURANT_DECIMALS = 4
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def hash_values(values):
+    """Hash de 64 bits (estável entre execuções) de cada valor de `values`."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def hash_coordinates(lat, lon, decimals=RESTAURANT_DECIMALS):
+    """Hash de 64 bits de cada par (lat, lon), arredondado em `decimals` casas."""
+    coords = pd.DataFrame({
+        'lat': np.round(np.asarray(lat, dtype=np.float64), decimals),
+        'lon': np.round(np.asarray(lon, dtype=np.float64), decimals),
+    })
+    return pd.util.hash_pandas_object(coords, index=False).to_numpy()
+
+
+def _bit_length(v):
+    """Número de bits significativos de cada uint64 (exato, sem float)."""
+    v = v.copy()
+    n = np.zeros(v.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = v >= (np.uint64(1) << np.uint64(shift))
+        v[big] >>= np.uint64(shift)
+        n += big * shift
+    return n + (v > 0)
+
+
+def hll_registers(groups, hashes, n_groups, p=HLL_PRECISION):
+    """
+    Sketches HLL (array uint8 n_groups x 2**p) dos `hashes`, um por grupo
+    (`groups`: índice do grupo de cada hash).
+    """
+    q = 64 - p
+    index = (hashes >> np.uint64(q)).astype(np.int64)
+    rest = hashes & np.uint64((1 << q) - 1)
+    rank = (q - _bit_length(rest) + 1).astype(np.uint8)
+
+    registers = np.zeros((n_groups, 2**p), dtype=np.uint8)
+    np.maximum.at(registers, (np.asarray(groups, dtype=np.int64), index), rank)
+    return registers
+
+
+def hll_estimate(registers):
+    """Estimativa de distintos de um sketch (1D) ou de cada linha (2D)."""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((linear <= 3 * m) & (zeros > 0), linear, raw)
+    return estimate if estimate.size > 1 else float(estimate[0])
+
+
+def hll_error(p=HLL_PRECISION):
+    """Erro padrão relativo das estimativas com precisão `p`."""
+    return 1.04 / np.sqrt(2**p)
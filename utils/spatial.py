@@ -0,0 +1,159 @@
+"""
+Índice espacial em grade para consultas por raio sobre restaurantes e
+locais de entrega.
+
+Os pontos são ordenados pela chave da célula (utils.geo.cell_key), então as
+células de uma faixa de latitude ocupam um intervalo contíguo: uma consulta
+por raio faz uma busca binária por faixa da caixa envolvente e calcula a
+distância exata (haversine) apenas para os candidatos, sem varrer a base.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import valid_coordinates
+from utils.data import DATA_PATH, cached, load_data
+from utils.geo import EARTH_RADIUS_KM, KM_PER_DEGREE, cell_key, haversine_np
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Lado da célula do índice, em graus (~5,5 km)
+INDEX_CELL_DEG = 0.05
+
+RESTAURANT_COORDS = ('Restaurant_latitude', 'Restaurant_longitude')
+DELIVERY_COORDS = ('Delivery_location_latitude', 'Delivery_location_longitude')
+
+
+#----------------CLASSES--------------
+#-------------------------------------
+class SpatialIndex:
+    """
+    Índice em grade sobre as coordenadas `coords` (lat, lon) de `df1`.
+
+    Linhas sem coordenada ficam fora do índice. O frame é lido, nunca
+    alterado; as consultas devolvem cópias das linhas encontradas com a
+    coluna `dist_km`.
+    """
+
+    def __init__(self, df1, coords, cell_deg=INDEX_CELL_DEG):
+        lat_col, lon_col = coords
+        lat = df1[lat_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        lon = df1[lon_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        ok = np.isfinite(lat) & np.isfinite(lon)
+
+        self.cell_deg = cell_deg
+        self.iy = np.floor(lat[ok] / cell_deg).astype(np.int64)
+        self.ix = np.floor(lon[ok] / cell_deg).astype(np.int64)
+        keys = cell_key(self.iy, self.ix)
+        order = np.argsort(keys, kind='stable')
+
+        self.keys = keys[order]
+        self.iy, self.ix = self.iy[order], self.ix[order]
+        self.lat, self.lon = lat[ok][order], lon[ok][order]
+        self.df = df1.iloc[np.flatnonzero(ok)[order]].reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _candidates(self, lat, lon, radius_km):
+        """Posições dos pontos nas células que cobrem a caixa envolvente do círculo."""
+        dlat = radius_km / KM_PER_DEGREE
+        lat_max = min(abs(lat) + dlat, 90.0)
+        if lat_max >= 90.0:
+            dlon = 180.0
+        else:
+            dlon = min(dlat / np.cos(np.radians(lat_max)), 180.0)
+
+        iy = np.arange(np.floor((lat - dlat) / self.cell_deg), np.floor((lat + dlat) / self.cell_deg) + 1, dtype=np.int64)
+        ix0 = np.floor((lon - dlon) / self.cell_deg)
+        ix1 = np.floor((lon + dlon) / self.cell_deg)
+
+        starts = np.searchsorted(self.keys, cell_key(iy, ix0), side='left')
+        stops = np.searchsorted(self.keys, cell_key(iy, ix1), side='right')
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)] or [np.empty(0, dtype=np.int64)])
+
+    def _within(self, lat, lon, radius_km):
+        pos = self._candidates(lat, lon, radius_km)
+        dist = haversine_np(np.full(len(pos), lat), np.full(len(pos), lon), self.lat[pos], self.lon[pos])
+        keep = dist <= radius_km
+        return pos[keep], dist[keep]
+
+    def _rows(self, pos, dist):
+        rows = self.df.take(pos)
+        rows['dist_km'] = dist
+        return rows.reset_index(drop=True)
+
+    def within(self, lat, lon, radius_km):
+        """Linhas a até `radius_km` km de (lat, lon), da mais próxima para a mais distante."""
+        pos, dist = self._within(lat, lon, radius_km)
+        order = np.argsort(dist, kind='stable')
+        return self._rows(pos[order], dist[order])
+
+    def nearest(self, lat, lon, k=5):
+        """
+        As `k` linhas mais próximas de (lat, lon).
+
+        O raio começa em uma célula e dobra até conter `k` pontos; todos os
+        pontos dentro do raio são conhecidos, então os `k` mais próximos
+        estão entre eles.
+        """
+        k = min(k, len(self))
+        radius_km = self.cell_deg * KM_PER_DEGREE
+        while True:
+            pos, dist = self._within(lat, lon, radius_km)
+            if len(pos) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                break
+            radius_km *= 2
+
+        order = np.argsort(dist, kind='stable')[:k]
+        return self._rows(pos[order], dist[order])
+
+    def cell_stats(self, column):
+        """
+        Quantidade, média e desvio padrão (ddof=1) de `column` por célula
+        ocupada, com o centro da célula (lat, lon). Valores ausentes são
+        ignorados nas estatísticas, mas contam em `orders`.
+        """
+        values = self.df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.isfinite(values)
+        keys, first, cell = np.unique(self.keys, return_index=True, return_inverse=True)
+
+        n = np.bincount(cell, weights=valid)
+        total = np.bincount(cell, weights=np.where(valid, values, 0))
+        mean = np.divide(total, n, out=np.full(len(keys), np.nan), where=n > 0)
+        sq = np.bincount(cell, weights=np.where(valid, (values - mean[cell]) ** 2, 0))
+        std = np.divide(sq, n - 1, out=np.full(len(keys), np.nan), where=n > 1)
+
+        return pd.DataFrame({
+            'lat': (self.iy[first] + 0.5) * self.cell_deg,
+            'lon': (self.ix[first] + 0.5) * self.cell_deg,
+            'orders': np.bincount(cell),
+            'count': n.astype(np.int64),
+            'mean': mean,
+            'std': np.sqrt(std),
+        })
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def restaurant_locations(df1):
+    """Um registro por restaurante (coordenada distinta) com pedidos e tempo médio de entrega."""
+    return (
+        df1.groupby(list(RESTAURANT_COORDS), dropna=True)
+           .agg(orders=('Time_taken(min)', 'size'), time_mean=('Time_taken(min)', 'mean'))
+           .reset_index()
+    )
+
+
+def load_restaurant_index(path=DATA_PATH):
+    """SpatialIndex dos restaurantes com coordenadas válidas, um por versão do CSV."""
+    def build():
+        df1 = load_data(columns=list(RESTAURANT_COORDS) + ['Time_taken(min)', 'coord_status'], path=path)
+        return SpatialIndex(restaurant_locations(valid_coordinates(df1)), RESTAURANT_COORDS)
+
+    return cached('restaurant_index', build, path)
+
+
+def load_delivery_index(path=DATA_PATH):
+    """SpatialIndex dos locais de entrega válidos (um ponto por pedido), um por versão do CSV."""
+    columns = list(DELIVERY_COORDS) + ['Order_Date', 'City', 'Time_taken(min)', 'coord_status']
+    return cached('delivery_index', lambda: SpatialIndex(valid_coordinates(load_data(columns=columns, path=path)), DELIVERY_COORDS), path)
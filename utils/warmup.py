@@ -0,0 +1,117 @@
+"""
+Aquecimento do cache na subida do servidor.
+
+`start_warmup()` roda, em uma thread daemon, a ingestão do CSV e as métricas
+das três páginas para o estado padrão do sidebar, deixando tudo nos caches
+em memória antes do primeiro acesso. A thread é iniciada uma única vez por
+processo (chamadas seguintes só retornam o estado) e `warmup_status()`
+informa o andamento e o tempo de cada etapa para o sidebar.
+"""
+import threading
+import time
+from datetime import datetime
+
+from utils.data import DATA_PATH, refresh
+from utils.metrics import (
+    COMPANY_SECTIONS,
+    available_cities,
+    company_metrics,
+    courier_metrics,
+    courier_profiles,
+    make_filters,
+    restaurant_metrics,
+)
+from utils.rollup import load_rollup
+
+#----------------CONSTANTES-----------
+#-------------------------------------
+# Estado padrão do sidebar das páginas (importado pelos widgets das páginas,
+# para que o aquecimento preencha as mesmas chaves de cache)
+DATA_LIMITE_PADRAO = datetime(2022, 4, 13)
+TRANSITO_PADRAO = ['Low']
+
+_lock = threading.Lock()
+_status = {}
+
+
+#----------------FUNÇÕES--------------
+#-------------------------------------
+def default_filters(path=DATA_PATH):
+    """Filters do estado inicial do sidebar (todas as cidades, trânsito Low)."""
+    return make_filters(DATA_LIMITE_PADRAO, available_cities(path), TRANSITO_PADRAO)
+
+
+def warmup_steps(path=DATA_PATH):
+    """Etapas do aquecimento, na ordem: [(nome, função sem argumentos)]."""
+    steps = [
+        ('ingestão', lambda: refresh(path)),
+        ('rollup', lambda: load_rollup(path)),
+    ]
+    for secao in COMPANY_SECTIONS:
+        steps.append((f'empresa/{secao}', lambda secao=secao: company_metrics(default_filters(path), path, secao=secao)))
+    steps.append(('entregadores', lambda: courier_metrics(default_filters(path), path)))
+    steps.append(('perfis', lambda: courier_profiles(path=path)))
+    steps.append(('restaurante', lambda: restaurant_metrics(default_filters(path), path)))
+    return steps
+
+
+def _run(path):
+    start = time.perf_counter()
+    for name, step in warmup_steps(path):
+        with _lock:
+            _status[path]['step'] = name
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:
+            with _lock:
+                _status[path].update(state='error', error=f'{name}: {exc!r}')
+            return
+        with _lock:
+            _status[path]['timings'][name] = time.perf_counter() - t0
+
+    with _lock:
+        _status[path].update(state='ready', step=None, seconds=time.perf_counter() - start)
+
+
+def start_warmup(path=DATA_PATH):
+    """
+    Inicia o aquecimento de `path` em segundo plano, se ainda não foi
+    iniciado neste processo, e retorna o estado atual (ver `warmup_status`).
+    """
+    with _lock:
+        if path not in _status:
+            _status[path] = {
+                'state': 'running',
+                'step': None,
+                'started_at': datetime.now(),
+                'seconds': None,
+                'timings': {},
+                'error': None,
+            }
+            threading.Thread(target=_run, args=(path,), name='warmup-cache', daemon=True).start()
+    return warmup_status(path)
+
+
+def warmup_status(path=DATA_PATH):
+    """
+    Cópia do estado do aquecimento: state ('idle', 'running', 'ready' ou
+    'error'), step (etapa em andamento), seconds (tempo total quando
+    pronto), timings (segundos por etapa concluída) e error.
+    """
+    with _lock:
+        status = _status.get(path)
+        if status is None:
+            return {'state': 'idle', 'step': None, 'seconds': None, 'timings': {}, 'error': None}
+        return {**status, 'timings': dict(status['timings'])}
+
+
+def status_text(status):
+    """Resumo de uma linha do estado do aquecimento, para o sidebar."""
+    if status['state'] == 'ready':
+        return f"Cache pronto ({status['seconds']:.1f}s)"
+    if status['state'] == 'error':
+        return f"Falha no aquecimento do cache: {status['error']}"
+    if status['state'] == 'running':
+        return f"Aquecendo o cache... ({status['step'] or 'iniciando'})"
+    return 'Cache frio'